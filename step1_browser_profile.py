@@ -0,0 +1,155 @@
+# Browser profiles for step1: which requests headless Chrome is allowed to make (blocked by
+# resource type or URL pattern through the DevTools protocol) and which Chrome features it
+# starts with, plus the bandwidth and page-load time a run used, to compare profiles.
+
+import json
+import threading
+
+# DevTools URL blocking matches URL patterns (* is a wildcard), so each resource type is
+# blocked by the file extensions or hosts it is served from
+RESOURCE_TYPE_PATTERNS = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "media": ["*.mp4", "*.webm", "*.mp3", "*.ogg", "*.wav"],
+    # Not in the lean preset: step1 reads element visibility, which some stylesheets decide
+    "stylesheet": ["*.css"],
+    "analytics": ["*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+                  "*hm.baidu.com*", "*cnzz.com*", "*51.la*"],
+}
+
+# default: Chrome as step1 always started it, nothing blocked
+# lean:    no images, fonts, media or analytics, no extensions, no GPU, a small window
+BROWSER_PROFILES = {
+    "default": {"block": [], "arguments": [], "prefs": {}},
+    "lean": {
+        "block": ["image", "font", "media", "analytics"],
+        "arguments": [
+            "--disable-extensions",
+            "--disable-gpu",
+            "--window-size=1024,768",  # still wide enough for the site's col-lg layout
+            "--blink-settings=imagesEnabled=false",
+            "--mute-audio",
+            "--no-first-run",
+            "--disable-default-apps",
+            "--disable-sync",
+            "--disable-background-networking",
+        ],
+        "prefs": {"profile.managed_default_content_settings.images": 2},
+    },
+}
+
+
+def url_patterns_for(resource_type):
+    """The blocking patterns of a resource type; extension patterns also match urls with a query string."""
+    patterns = []
+    for pattern in RESOURCE_TYPE_PATTERNS[resource_type]:
+        patterns.append(pattern)
+        if pattern.startswith("*."):
+            patterns.append(pattern + "?*")
+    return patterns
+
+
+class BrowserProfile:
+    """The Chrome options and request blocking every browser of a run is started with."""
+
+    def __init__(self):
+        self.configure()
+
+    def configure(self, name="default", block=None, block_patterns=(), report_bandwidth=False):
+        """
+        name picks a preset from BROWSER_PROFILES; block (resource types) replaces the
+        preset's blocked types when given, block_patterns are added to them.
+        Chrome's performance log (what NetworkUsage counts bandwidth from) is only turned on
+        with report_bandwidth or a profile other than Chrome as step1 always started it,
+        since recording every network event costs memory and time on long crawls.
+        """
+        if name not in BROWSER_PROFILES:
+            raise ValueError(f"Unknown browser profile '{name}', expected one of {sorted(BROWSER_PROFILES)}.")
+        blocked_types = BROWSER_PROFILES[name]["block"] if block is None else block
+        unknown_types = [resource_type for resource_type in blocked_types if resource_type not in RESOURCE_TYPE_PATTERNS]
+        if unknown_types:
+            raise ValueError(f"Unknown resource types {unknown_types}, expected some of {sorted(RESOURCE_TYPE_PATTERNS)}.")
+        self.name = name
+        self.blocked_types = list(blocked_types)
+        self.blocked_url_patterns = [pattern for resource_type in self.blocked_types
+                                     for pattern in url_patterns_for(resource_type)] + list(block_patterns)
+        self.performance_log = bool(report_bandwidth or name != "default" or self.blocked_url_patterns)
+
+    def apply_to_options(self, chrome_options):
+        """Adds the profile's arguments and preferences, and the performance log NetworkUsage reads (when on)."""
+        for argument in BROWSER_PROFILES[self.name]["arguments"]:
+            chrome_options.add_argument(argument)
+        if BROWSER_PROFILES[self.name]["prefs"]:
+            chrome_options.add_experimental_option("prefs", BROWSER_PROFILES[self.name]["prefs"])
+        if self.performance_log:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    def attach(self, driver):
+        """Turns on request blocking in a started browser."""
+        if self.blocked_url_patterns:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_url_patterns})
+
+    def describe(self):
+        blocked = ", ".join(self.blocked_types) or "nothing"
+        extra_patterns = len(self.blocked_url_patterns) - sum(len(url_patterns_for(t)) for t in self.blocked_types)
+        return f"'{self.name}' (blocking {blocked}{f' + {extra_patterns} url patterns' if extra_patterns else ''})"
+
+
+class NetworkUsage:
+    """
+    Adds up, from the browsers' performance logs, the bytes downloaded and the requests
+    made or blocked, and the time pages took to load, for the end-of-run report.
+    Bandwidth is only counted when the browser profile turns the performance log on.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.lock = threading.Lock()  # Several browsers may load pages at once
+        self.pages = 0
+        self.page_seconds = 0.0
+        self.bytes = 0
+        self.requests = 0
+        self.blocked_requests = 0
+        self.log_available = True
+
+    def collect(self, driver):
+        """Reads (and so empties) the driver's performance log into the totals."""
+        if not self.profile.performance_log or not self.log_available:
+            return
+        try:
+            log_entries = driver.get_log("performance")
+        except Exception as e:
+            print(f"   Bandwidth is not reported: the browser's performance log is not available ({e}).")
+            self.log_available = False
+            return
+
+        received_bytes = requests = blocked_requests = 0
+        for log_entry in log_entries:
+            message = json.loads(log_entry["message"])["message"]
+            if message["method"] == "Network.loadingFinished":
+                received_bytes += message["params"].get("encodedDataLength", 0)
+                requests += 1
+            elif message["method"] == "Network.loadingFailed" and message["params"].get("blockedReason"):
+                blocked_requests += 1
+        with self.lock:
+            self.bytes += int(received_bytes)
+            self.requests += requests
+            self.blocked_requests += blocked_requests
+
+    def page_loaded(self, driver, seconds):
+        """Counts one page that took seconds from navigation until its content settled."""
+        with self.lock:
+            self.pages += 1
+            self.page_seconds += seconds
+        self.collect(driver)
+
+    def report(self, profile):
+        print(f"\n--- Network usage (browser profile {profile.describe()}) ---")
+        average_seconds = self.page_seconds / self.pages if self.pages else 0.0
+        print(f"   {self.pages} pages loaded, avg {average_seconds:.2f} s per page")
+        if not profile.performance_log:
+            print("   Bandwidth not collected (turn on with --report_bandwidth)")
+        elif self.log_available:
+            print(f"   {self.bytes / 1024 / 1024:.1f} MB downloaded in {self.requests} requests, "
+                  f"{self.blocked_requests} requests blocked")
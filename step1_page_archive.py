@@ -0,0 +1,267 @@
+# cmd prompt ex:
+# python step1_scrapepokeking.py directory_name --archive_html     (saves every expanded page while scraping)
+# python step1_page_archive.py reextract directory_name            (re-runs the extraction on the saved pages, no browser)
+# python step1_page_archive.py reextract directory_name -o directory_name\reextracted --output_format jsonl
+
+import os
+import re
+import gzip
+import json
+import argparse
+import traceback
+
+from lxml import html as lxml_html
+
+import step1_page_records as records
+
+DEFAULT_REEXTRACT_DIRNAME = "reextracted"
+
+
+def iter_archived_pages(archive_dir, kind="page"):
+    """
+    Yields (url, x_val, sha256) for every archived page of the given kind ("page" for target
+    pages, "first_page" for first pages), in the order they were scraped.
+    A page archived more than once (re-scraped) is yielded once, with its latest HTML.
+    """
+    latest_entries = {}
+    with open(os.path.join(archive_dir, records.ARCHIVE_INDEX_FILENAME), "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                if entry.get("kind", "page") == kind:
+                    latest_entries.setdefault(entry["url"], entry).update(entry)
+    for entry in latest_entries.values():
+        yield entry["url"], entry["x"], entry["sha256"]
+
+
+def read_archived_html(archive_dir, sha256):
+    with open(records.archive_object_path(archive_dir, sha256), "rb") as f:
+        return gzip.decompress(f.read()).decode("utf-8")
+
+
+# --- Offline extraction: the selectors of step1 as XPath over the archived HTML ---
+
+def has_class(*class_names):
+    """XPath predicate matching elements that have all the given classes, like CSS .a.b"""
+    return " and ".join(f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')" for name in class_names)
+
+
+ALERT_BOX_XPATH = f'//div[@role="alert" and {has_class("alert-success")}]'
+ALERT_TEXT_XPATH = './/div[@data-v-51cd036b and not(./button)]'
+CARD_HEADER_XPATH = (f'//*[{has_class("col-lg-9")}]//div[@role="tablist"]/div[{has_class("card", "mb-1")}]'
+                     '//header[@role="tab"]//div[@role="button"]')
+CARD_XPATH = f'//div[{has_class("card", "mb-1")}][.//header[@role="tab"]//div[@role="button"][@aria-controls=$card_body_id]]'
+NODE_DIV_XPATH = f'.//div[{has_class("node-div")}]'
+NODE_TITLE_XPATH = f'.//div[{has_class("node-title")}]'
+NODE_LABEL_XPATH = f'.//b[{has_class("node-label")}]'
+NODE_OPERATE_XPATH = f'.//b[{has_class("node-operate")}]'
+NODE_BODY_TEXT_XPATH = f'.//b[{has_class("node-label")} or {has_class("node-operate")}][not(ancestor::div[@class="node-title"])]'
+TRICK_XPATH = './/div[@role="alert"]//b'
+WARNING_BADGE_XPATH = f'.//span[{has_class("badge", "badge-warning")}]'
+POKEMON_NAME_XPATH = './/b[contains(@style, "margin-left: 5px")]'
+RED_BOLD_XPATH = './/b[contains(@style, "color: red")]'
+
+HIDDEN_STYLE_PATTERN = re.compile(r"display\s*:\s*none")
+# Elements that start a new line in the rendered text
+BLOCK_TAGS = {"div", "p", "br", "li", "ul", "ol", "tr", "table", "header", "section",
+              "h1", "h2", "h3", "h4", "h5", "h6"}
+SKIPPED_TAGS = {"script", "style", "template"}
+
+
+def is_hidden(element):
+    return element.get("hidden") is not None or bool(HIDDEN_STYLE_PATTERN.search(element.get("style", "")))
+
+
+def is_displayed(element):
+    return not any(is_hidden(ancestor) for ancestor in element.iterancestors()) and not is_hidden(element)
+
+
+def element_text(element):
+    """
+    The text of an element the way Selenium's .text reads it from the live page: only
+    displayed content, one line per block element, spaces collapsed; "" when not displayed.
+    """
+    if element is None:
+        return None
+    if not is_displayed(element):
+        return ""
+
+    parts = []
+
+    def collect(node):
+        if not isinstance(node.tag, str) or node.tag in SKIPPED_TAGS or is_hidden(node):
+            return
+        is_block = node.tag in BLOCK_TAGS
+        if is_block:
+            parts.append("\n")
+        parts.append(node.text or "")
+        for child in node:
+            collect(child)
+            parts.append(child.tail or "")
+        if is_block:
+            parts.append("\n")
+
+    collect(element)
+    lines = (re.sub(r"[ \t\r\f\v\u00a0]+", " ", line).strip() for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def first_match(element, xpath, **variables):
+    matches = element.xpath(xpath, **variables)
+    return matches[0] if matches else None
+
+
+def closest_node_div(element):
+    """The element itself or its nearest ancestor that is a div.node-div, like JS closest()."""
+    for candidate in [element, *element.iterancestors()]:
+        if is_node_div(candidate):
+            return candidate
+    return None
+
+
+def is_node_div(element):
+    return element.tag == "div" and "node-div" in element.get("class", "").split()
+
+
+def rendered_matches(element, xpath):
+    """
+    The matches of xpath inside a card or nested item that click mode has rendered when it
+    reads it: not inside a node-div two levels below it, which click mode only adds to the
+    page once their parent item is clicked (see NESTED_ITEM_MATCHES_SCRIPT).
+    """
+    matches = []
+    for match in element.xpath(xpath):
+        levels = 0
+        for ancestor in match.iterancestors():
+            if ancestor is element:
+                break
+            levels += is_node_div(ancestor)
+        if levels < 2:
+            matches.append(match)
+    return matches
+
+
+def collapsed_card_text(card, card_body, xpath):
+    """
+    The text click mode reads for a card while it is still collapsed: the first rendered
+    match, and "" when that is inside the card body, which is hidden until the card is opened.
+    """
+    matches = rendered_matches(card, xpath)
+    if not matches:
+        return None
+    if card_body is not None and (matches[0] is card_body or card_body in matches[0].iterancestors()):
+        return ""
+    return element_text(matches[0])
+
+
+def child_node_divs(parent):
+    """The node-divs directly below parent, as in bulk expansion (see NESTED_CHILD_NODES_SCRIPT)."""
+    parent_node = closest_node_div(parent)
+    return [node for node in parent.xpath(NODE_DIV_XPATH)
+            if closest_node_div(node.getparent()) is parent_node]
+
+
+def read_node(node):
+    header = first_match(node, NODE_TITLE_XPATH)
+    if header is None:
+        return {"error": True}
+    return {
+        "header_label": element_text(first_match(header, NODE_LABEL_XPATH)),
+        "header_operate": element_text(first_match(header, NODE_OPERATE_XPATH)),
+        "trick": element_text((rendered_matches(node, TRICK_XPATH) or [None])[0]),
+        "warning_badge": element_text((rendered_matches(node, WARNING_BADGE_XPATH) or [None])[0]),
+        "body_texts": [element_text(element) for element in rendered_matches(node, NODE_BODY_TEXT_XPATH)],
+        "children": [read_node(child) for child in child_node_divs(node)],
+    }
+
+
+def read_archived_page(page_html):
+    """Reads an archived page into the structure step1 reads with EXTRACT_PAGE_SCRIPT and COLLAPSED_CARDS_SCRIPT."""
+    document = lxml_html.fromstring(page_html)
+    page = {"alert_box_texts": None, "cards": []}
+
+    alert_box = first_match(document, ALERT_BOX_XPATH)
+    if alert_box is not None:
+        page["alert_box_texts"] = [element_text(element) for element in alert_box.xpath(ALERT_TEXT_XPATH)]
+
+    for card_header in document.xpath(CARD_HEADER_XPATH):
+        card_body_id = card_header.get("aria-controls")
+        if not card_body_id:
+            continue
+        card = first_match(document, CARD_XPATH, card_body_id=card_body_id)
+        card_body = first_match(document, '//*[@id=$card_body_id]', card_body_id=card_body_id)
+        # The archive holds the opened page, so the collapsed values are read as click mode
+        # read them before opening the card
+        page["cards"].append({
+            "pokemon_name": collapsed_card_text(card, card_body, POKEMON_NAME_XPATH) if card is not None else None,
+            "red_bold_text": collapsed_card_text(card, card_body, RED_BOLD_XPATH) if card is not None else None,
+            "warning_badge_text": collapsed_card_text(card, card_body, WARNING_BADGE_XPATH) if card is not None else None,
+            "body_visible": card_body is not None and is_displayed(card_body),
+            "nested_items": [read_node(node) for node in child_node_divs(card_body)] if card_body is not None else [],
+        })
+    return page
+
+
+def reextract_archive(run_dir, output_dir=None, output_format="both"):
+    """
+    Re-runs the card and nested-node extraction on every archived page of a run and writes
+    fresh X files to output_dir (default: <run_dir>/reextracted), without a browser.
+
+    Returns:
+        int: The number of pages re-extracted.
+    """
+    archive_dir = os.path.join(run_dir, records.ARCHIVE_DIRNAME)
+    if not os.path.exists(os.path.join(archive_dir, records.ARCHIVE_INDEX_FILENAME)):
+        print(f"Error: No page archive found in '{run_dir}'. Scrape with --archive_html first.")
+        return 0
+
+    output_dir = output_dir or os.path.join(run_dir, DEFAULT_REEXTRACT_DIRNAME)
+    if os.path.realpath(output_dir) == os.path.realpath(run_dir):
+        # The X files of output_dir are deleted below; those of the run itself must survive
+        print(f"Error: The output folder is the run folder '{run_dir}', whose X files would be replaced. Choose another folder with -o.")
+        return 0
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Re-extracting archived pages of '{run_dir}' into '{output_dir}'...")
+
+    # The X files are rebuilt from scratch, not appended to
+    for filename in os.listdir(output_dir):
+        if filename.startswith("pokeking_icu_home_X_") and filename.endswith(tuple(records.OUTPUT_FORMAT_SUFFIXES[output_format])):
+            os.remove(os.path.join(output_dir, filename))
+
+    page_count = 0
+    written_x_categories = set()
+    for url, x_val, sha256 in iter_archived_pages(archive_dir):
+        try:
+            current_x, current_y = records.page_xy_from_url(url)
+            extracted_data = records.page_data_from_script(read_archived_page(read_archived_html(archive_dir, sha256)),
+                                                         current_x, current_y)
+        except Exception as e:
+            print(f"   Error re-extracting {url} ({sha256}): {e}")
+            traceback.print_exc()
+            continue
+        page_count += 1
+        if extracted_data:
+            records.write_page_data(output_dir, x_val, extracted_data, url, output_format)
+            written_x_categories.add(x_val)
+
+    print(f"Re-extracted {page_count} pages for X categories: {sorted(written_x_categories, key=str)}.")
+    return page_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Offline tools for the expanded-page archive step1 writes with --archive_html."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reextract_parser = subparsers.add_parser("reextract", help="Re-run the extraction on the archived pages of a run, without a browser.")
+    reextract_parser.add_argument("run_dir", help="The run directory scraped with --archive_html.")
+    reextract_parser.add_argument("-o", "--output_dir", default=None,
+                                  help=f"Where to write the X files (default: <run_dir>/{DEFAULT_REEXTRACT_DIRNAME}).")
+    reextract_parser.add_argument("--output_format", choices=sorted(records.OUTPUT_FORMAT_SUFFIXES), default="both",
+                                  help="Write the X files as 'text' (.txt), 'jsonl' (.jsonl) or 'both' (default).")
+
+    args = parser.parse_args()
+
+    if args.command == "reextract":
+        reextract_archive(args.run_dir, args.output_dir, args.output_format)
@@ -0,0 +1,210 @@
+# Page records of step1 without a browser: the archive layout, the X files and their output
+# formats, and the records built from EXTRACT_PAGE_SCRIPT's result. step1_page_archive.py
+# uses these to re-extract archived pages where selenium is not installed.
+
+import os
+import json
+import gzip
+import hashlib
+import threading
+from urllib.parse import urlparse
+
+# --archive_html keeps every scraped (expanded) page in the run directory, for
+# re-extraction without a browser (see step1_page_archive.py):
+#   html_archive/objects/<sha256[:2]>/<sha256>.html.gz   each distinct page HTML, gzip-compressed
+#   html_archive/index.jsonl                              one {"url", "x", "sha256", "kind"} record per scraped page
+# kind is "page" for target pages and "first_page" for the first pages their links were read from
+ARCHIVE_DIRNAME = "html_archive"
+ARCHIVE_INDEX_FILENAME = "index.jsonl"
+archive_index_lock = threading.Lock()  # Several browsers may archive pages at once
+
+
+def page_xy_from_url(url):
+    """Returns (page_x, page_y) of a home/x/y url, "N/A" for the parts that are missing."""
+    path_segments = [s for s in urlparse(url).path.split('/') if s]
+    current_x = "N/A"
+    current_y = "N/A"
+    if len(path_segments) >= 3 and path_segments[-3] == 'home': # Adjusted index for home/x/y
+        try:
+            current_x = int(path_segments[-2])
+            current_y = int(path_segments[-1])
+        except ValueError:
+            pass
+    return current_x, current_y
+
+def x_val_from_url(url):
+    """Returns the X category of a home/x/y target url, or "unknown_x"."""
+    path_segments_target = [s for s in urlparse(url).path.split('/') if s]
+    try:
+        if len(path_segments_target) >= 3 and path_segments_target[-3] == 'home':
+            return int(path_segments_target[-2])
+    except ValueError:
+        pass
+    return "unknown_x"
+
+def format_nested(nested_list, depth=0):
+    """Formats nested items (and their sub-nested items) as indented text lines."""
+    nested_lines = []
+    indent_str = "  " * (depth + 1)
+    if nested_list:
+        nested_lines.append(f"{indent_str}--- Nested Items ({len(nested_list)}) ---")
+        for nested_entry in nested_list:
+            nested_lines.append(f"{indent_str}   Nested Item {nested_entry.get('nested_index', 'N/A')}:")
+            nested_lines.append(f"{indent_str}     nested_header_label_text (collapsed): {nested_entry.get('nested_header_label_text', 'N/A')}")
+            nested_lines.append(f"{indent_str}     nested_header_operate_text (collapsed): {nested_entry.get('nested_header_operate_text', 'N/A')}")
+            nested_lines.append(f"{indent_str}     nested_trick_text (expanded): {nested_entry.get('nested_trick_text', 'N/A')}")
+            nested_lines.append(f"{indent_str}     nested_body_label_text (expanded): {nested_entry.get('nested_body_label_text', 'N/A')}")
+            nested_lines.append(f"{indent_str}     nested_body_operate_text (expanded): {nested_entry.get('nested_body_operate_text', 'N/A')}")
+            nested_lines.append(f"{indent_str}     nested_warning_badge_text (expanded): {nested_entry.get('nested_warning_badge_text', 'N/A')}")
+
+            # Recursively format sub-nested items
+            sub_nested_data = nested_entry.get('sub_nested_items', [])
+            nested_lines.extend(format_nested(sub_nested_data, depth + 1))
+            nested_lines.append(f"{indent_str}   --------------------")
+    return nested_lines
+
+def format_page_data_as_text(extracted_data):
+    """Formats the data items of one page as the human-readable text block of the X files."""
+    formatted_output_lines = []
+    for data_item in extracted_data:
+        formatted_output_lines.append("=" * 10 + f" Data from page {data_item.get('page_x', 'N/A')}/{data_item.get('page_y', 'N/A')} " + "=" * 10)
+
+        if data_item.get("type") == "alert_box_data":
+            formatted_output_lines.append(f"--- Alert Box Data ---")
+            for text in data_item.get("alert_box_texts", []):
+                formatted_output_lines.append(f"   Alert Text: {text}")
+        elif data_item.get("type") == "card_data":
+            formatted_output_lines.append(f"--- Card Entry (Card {data_item.get('card_index', 'N/A')}) ---")
+
+            formatted_output_lines.append(f"pokemon_name: {data_item.get('pokemon_name', 'N/A')}")
+            formatted_output_lines.append(f"red_bold_text: {data_item.get('red_bold_text', 'N/A')}")
+            formatted_output_lines.append(f"warning_badge_text: {data_item.get('warning_badge_text', 'N/A')}")
+            formatted_output_lines.append(f"primary_trick_text: {data_item.get('primary_trick_text', 'N/A')}")
+
+            formatted_output_lines.extend(format_nested(data_item.get('nested_items', [])))
+
+            formatted_output_lines.append("-" * 30)
+
+    return "\n".join(formatted_output_lines) + "\n\n"
+
+def format_page_data_as_jsonl(extracted_data, url):
+    """
+    Formats the data items of one page as JSON Lines: one record per alert box or card,
+    exactly the dictionaries extract_specific_data_from_page returns plus the page url.
+    step2 reads these records directly instead of parsing the text format.
+    """
+    return "".join(json.dumps({**data_item, "url": url}, ensure_ascii=False) + "\n"
+                   for data_item in extracted_data)
+
+# Output formats of the X files: file suffix -> formatter(extracted_data, url)
+OUTPUT_FORMATTERS = {
+    ".txt": lambda extracted_data, url: format_page_data_as_text(extracted_data),
+    ".jsonl": format_page_data_as_jsonl,
+}
+OUTPUT_FORMAT_SUFFIXES = {
+    "text": [".txt"],
+    "jsonl": [".jsonl"],
+    "both": [".txt", ".jsonl"],
+}
+
+def write_page_data(output_base_dir, x_val, extracted_data, url, output_format="both"):
+    """
+    Appends the data of one page to the X file(s) of its category in the chosen output format.
+    Returns the paths written to (none for a page without data).
+    """
+    written_paths = []
+    if not extracted_data:
+        return written_paths
+    for suffix in OUTPUT_FORMAT_SUFFIXES[output_format]:
+        file_path = os.path.join(output_base_dir, f"pokeking_icu_home_X_{x_val}_data{suffix}")
+        with open(file_path, "a", encoding="utf-8") as f:
+            f.write(OUTPUT_FORMATTERS[suffix](extracted_data, url))
+        written_paths.append(file_path)
+    return written_paths
+
+def script_text(text):
+    """A field value as the element-by-element path stores it: stripped text, or "N/A" when there is no element."""
+    return "N/A" if text is None else text.strip()
+
+def nested_data_from_script(nodes, nested_depth=0):
+    """Builds extract_nested_data's list of dicts from the nodes EXTRACT_PAGE_SCRIPT returned."""
+    nested_items_data = []
+    for j, node in enumerate(nodes):
+        nested_data = {
+            "nested_index": f"{nested_depth}-{j+1}",
+            "nested_header_label_text": "N/A",
+            "nested_header_operate_text": "N/A",
+            "nested_trick_text": "N/A",
+            "nested_body_label_text": "N/A",
+            "nested_body_operate_text": "N/A",
+            "nested_warning_badge_text": "N/A",
+            "sub_nested_items": []
+        }
+        if node.get("error"):
+            # Same values the element-by-element path stores when a nested item has no title
+            for field in ("nested_trick_text", "nested_body_label_text", "nested_body_operate_text", "nested_warning_badge_text"):
+                nested_data[field] = "Error during processing, data not captured."
+        else:
+            nested_data["nested_header_label_text"] = script_text(node["header_label"])
+            nested_data["nested_header_operate_text"] = script_text(node["header_operate"])
+            nested_data["nested_trick_text"] = script_text(node["trick"])
+            nested_data["nested_warning_badge_text"] = script_text(node["warning_badge"])
+            body_texts = [text.strip() for text in node["body_texts"]]
+            if len(body_texts) >= 1:
+                nested_data["nested_body_label_text"] = body_texts[0]
+            if len(body_texts) >= 2:
+                nested_data["nested_body_operate_text"] = body_texts[1]
+            nested_data["sub_nested_items"] = nested_data_from_script(node["children"], nested_depth + 1)
+        nested_items_data.append(nested_data)
+    return nested_items_data
+
+def page_data_from_script(page, current_x, current_y):
+    """Builds extract_specific_data_from_page's list of dicts from EXTRACT_PAGE_SCRIPT's result."""
+    all_extracted_data = []
+
+    alert_texts = [text.strip() for text in page["alert_box_texts"] or [] if text.strip()]
+    if alert_texts:
+        all_extracted_data.append({
+            "type": "alert_box_data",
+            "page_x": current_x,
+            "page_y": current_y,
+            "alert_box_texts": alert_texts
+        })
+
+    for i, card in enumerate(page["cards"]):
+        all_extracted_data.append({
+            "type": "card_data",
+            "card_index": i + 1,
+            "page_x": current_x,
+            "page_y": current_y,
+            "pokemon_name": script_text(card["pokemon_name"]),
+            "red_bold_text": script_text(card["red_bold_text"]),
+            "warning_badge_text": script_text(card["warning_badge_text"]),
+            "primary_trick_text": "N/A",
+            "nested_items": nested_data_from_script(card["nested_items"]) if card["body_visible"] else []
+        })
+    return all_extracted_data
+
+def archive_object_path(archive_dir, sha256):
+    return os.path.join(archive_dir, "objects", sha256[:2], sha256 + ".html.gz")
+
+def archive_page_html(archive_dir, url, x_val, page_html, kind="page"):
+    """
+    Stores the HTML of one expanded page under its sha256 (identical pages are stored once)
+    and records the page in the archive index. Returns the sha256.
+    """
+    html_bytes = page_html.encode("utf-8")
+    sha256 = hashlib.sha256(html_bytes).hexdigest()
+    object_path = archive_object_path(archive_dir, sha256)
+    if not os.path.exists(object_path):
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        # Written under a temporary name first so a crash never leaves a truncated object
+        tmp_path = f"{object_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(gzip.compress(html_bytes))
+        os.replace(tmp_path, object_path)
+
+    with archive_index_lock:
+        with open(os.path.join(archive_dir, ARCHIVE_INDEX_FILENAME), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"url": url, "x": x_val, "sha256": sha256, "kind": kind}, ensure_ascii=False) + "\n")
+    return sha256
@@ -5,12 +5,20 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin
+import copy
+import json
+import hashlib
+import queue
+import threading
 import time
 import traceback # Import traceback module
+from step1_wait_policies import WAIT_MODES, DEFAULT_POLL_FREQUENCY, NetworkIdle, SubtreeSettled, WaitPolicyEngine, all_of, install_network_hook
+from step1_browser_profile import BROWSER_PROFILES, RESOURCE_TYPE_PATTERNS, BrowserProfile, NetworkUsage
+from step1_page_records import (ARCHIVE_DIRNAME, OUTPUT_FORMAT_SUFFIXES, archive_page_html, page_data_from_script,
+                                page_xy_from_url, script_text, write_page_data, x_val_from_url)
 
 
 # --- IMPORTANT: Get credentials from environment variables ---
@@ -20,12 +28,51 @@ import traceback # Import traceback module
 YOUR_USERNAME = os.getenv("YOUR_USERNAME")
 YOUR_PASSWORD = os.getenv("YOUR_PASSWORD")
 
-if not YOUR_USERNAME or not YOUR_PASSWORD:
-    print("Error: Username and/or password environment variables not set.")
-    print("Please set YOUR_USERNAME and YOUR_PASSWORD environment variables.")
-    exit() # Exit the script if credentials are not found
+def require_credentials():
+    """Exits the script if the credentials are not set; called before any login."""
+    if not YOUR_USERNAME or not YOUR_PASSWORD:
+        print("Error: Username and/or password environment variables not set.")
+        print("Please set YOUR_USERNAME and YOUR_PASSWORD environment variables.")
+        exit() # Exit the script if credentials are not found
 # -------------------------------------------------------------
 
+BASE_FIRST_URL = "http://www.pokeking.icu/king/tree/first/"
+NUM_FIRST_PAGES = 26
+
+# Every wait of the scraper runs under one of these policies: name, timeout in seconds, and
+# the fixed sleep step1 used to add there (only slept with --wait_mode fixed)
+WAITS = WaitPolicyEngine()
+for policy_name, policy_timeout, policy_fixed_sleep in [
+    ("login_form", 10, 3.5),
+    ("login_alert", 10, 0),
+    ("login_redirect", 10, 2),
+    ("login_settled", 10, 5),
+    ("session_check", 15, 0),
+    ("first_page_images", 15, 3),
+    ("target_navigation", 20, 0),
+    ("target_content", 10, 3),
+    ("back_navigation", 10, 2),
+    ("alert_box", 5, 0),
+    ("card_headers", 7, 0),
+    ("card_element", 10, 0),
+    ("card_expand", 5, 3),
+    ("card_body", 5, 0),
+    ("nested_header", 5, 0),
+    ("nested_expand", 5, 0.5),
+    ("bulk_expand", 25, 0),
+]:
+    WAITS.register(policy_name, policy_timeout, policy_fixed_sleep)
+
+# What every browser is started with (--browser_profile, --block) and what the run downloaded
+BROWSER_PROFILE = BrowserProfile()
+NETWORK_USAGE = NetworkUsage(BROWSER_PROFILE)
+
+# How cards and nested items get opened: "click" clicks them one at a time while scraping,
+# "bulk" opens the whole tree with one script first (see expand_all_collapsibles)
+EXPANSION_MODES = ["click", "bulk"]
+PAGE_SCRAPE_SETTINGS = {"expansion": "click", "extraction": "elements", "archive_dir": None, "checkpoint": None,
+                        "change_detector": None, "nested_memo": None}
+
 def initialize_driver():
     """Initializes and returns a Chrome WebDriver."""
     chrome_options = Options()
@@ -36,11 +83,37 @@ def initialize_driver():
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--log-level=3")
     chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    BROWSER_PROFILE.apply_to_options(chrome_options)
 
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    try:
+        driver = webdriver.Chrome(service=Service(resolve_driver_path()), options=chrome_options)
+    except Exception as e:
+        # The cached driver may no longer match Chrome after a Chrome update
+        print(f"Could not start Chrome with the cached driver ({e}). Resolving the driver again...")
+        driver = webdriver.Chrome(service=Service(resolve_driver_path(use_cache=False)), options=chrome_options)
+    BROWSER_PROFILE.attach(driver)
+    install_network_hook(driver)
     return driver
 
+# ChromeDriverManager().install() looks the matching driver up online on every call, so the
+# path it resolved is kept next to the script and reused while that file still exists
+DRIVER_PATH_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".chromedriver_path")
+
+def resolve_driver_path(use_cache=True):
+    """Returns the chromedriver path, from the cache when it is still valid."""
+    if use_cache and os.path.exists(DRIVER_PATH_CACHE):
+        with open(DRIVER_PATH_CACHE, "r", encoding="utf-8") as f:
+            cached_path = f.read().strip()
+        if os.path.exists(cached_path):
+            return cached_path
+
+    driver_path = ChromeDriverManager().install()
+    tmp_path = f"{DRIVER_PATH_CACHE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(driver_path)
+    os.replace(tmp_path, DRIVER_PATH_CACHE)
+    return driver_path
+
 def perform_login(driver, login_url, username, password):
     """
     Navigates to the login page, attempts to log in, and handles the post-login pop-up.
@@ -48,28 +121,26 @@ def perform_login(driver, login_url, username, password):
     """
     print(f"Attempting to log in to: {login_url}")
     driver.get(login_url)
-    time.sleep(3) # Initial page load time for login form elements
 
     try:
-        username_field = WebDriverWait(driver, 10).until(
+        username_field = WAITS.wait("login_form", driver,
             EC.presence_of_element_located((By.ID, 'username'))
         )
-        password_field = WebDriverWait(driver, 10).until(
+        password_field = WAITS.wait("login_form", driver,
             EC.presence_of_element_located((By.ID, '__BVID__17'))
         )
-        login_button = WebDriverWait(driver, 10).until(
+        login_button = WAITS.wait("login_form", driver,
             EC.element_to_be_clickable((By.ID, 'btnLogin'))
         )
 
         username_field.send_keys(username)
         password_field.send_keys(password)
 
-        time.sleep(0.5)
         print("   Credentials entered. Clicking login button...")
         login_button.click()
 
         print("   Waiting for login success alert...")
-        WebDriverWait(driver, 10).until(EC.alert_is_present())
+        WAITS.wait("login_alert", driver, EC.alert_is_present())
 
         alert = driver.switch_to.alert
         alert_text = alert.text
@@ -77,12 +148,12 @@ def perform_login(driver, login_url, username, password):
 
         alert.accept()
         print("   Alert accepted.")
-        time.sleep(2)
+        WAITS.wait("login_redirect", driver, NetworkIdle())
 
         print("   Attempting to dismiss any potential in-page pop-up by sending ENTER key (if applicable)...")
         driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.ENTER)
 
-        time.sleep(5)
+        WAITS.wait("login_settled", driver, NetworkIdle())
         print("   Login interaction complete.")
 
         return True
@@ -92,17 +163,297 @@ def perform_login(driver, login_url, username, password):
         print("Screenshot 'login_failed' saved for debugging.")
         return False
 
-def extract_nested_data(driver, parent_element, nested_depth=0):
+# After a login the session (cookies and localStorage) is saved here, and the next run
+# restores it instead of logging in again. It grants access to the account: keep it private.
+DEFAULT_SESSION_PATH = "pokeking_session.json"
+
+READ_LOCAL_STORAGE_SCRIPT = """
+var items = {};
+for (var i = 0; i < window.localStorage.length; i++) {
+    var key = window.localStorage.key(i);
+    items[key] = window.localStorage.getItem(key);
+}
+return items;
+"""
+
+# Runs before the site's own scripts on every new document; only fills in missing items,
+# so values the site changes later are not overwritten
+RESTORE_LOCAL_STORAGE_SCRIPT = """
+(function (items) {
+    try {
+        Object.keys(items).forEach(function (key) {
+            if (window.localStorage.getItem(key) === null) {
+                window.localStorage.setItem(key, items[key]);
+            }
+        });
+    } catch (e) {}
+})(%s);
+"""
+
+def read_session(driver):
+    """The logged-in session of driver (on a pokeking.icu page): its cookies and localStorage."""
+    return {
+        "cookies": driver.get_cookies(),
+        "local_storage": driver.execute_script(READ_LOCAL_STORAGE_SCRIPT),
+    }
+
+def install_session(driver, session):
+    """
+    Puts a session into a driver before it opens any page of the site: the cookies through
+    DevTools, localStorage through a script run on every new document.
+    Returns the identifier of that script.
+    """
+    cookies = []
+    for cookie in session["cookies"]:
+        cdp_cookie = {key: cookie[key] for key in ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite") if key in cookie}
+        if "expiry" in cookie:
+            cdp_cookie["expires"] = cookie["expiry"]
+        cookies.append(cdp_cookie)
+    driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+    return driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+        "source": RESTORE_LOCAL_STORAGE_SCRIPT % json.dumps(session["local_storage"], ensure_ascii=False)})["identifier"]
+
+def save_session(driver, session_path=DEFAULT_SESSION_PATH):
+    """Saves the logged-in session of driver (on a pokeking.icu page) to session_path."""
+    session = read_session(driver)
+    tmp_path = f"{session_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(session, f, ensure_ascii=False)
+    os.chmod(tmp_path, 0o600)
+    os.replace(tmp_path, session_path)
+    print(f"   Session saved to {session_path} ({len(session['cookies'])} cookies, {len(session['local_storage'])} localStorage items).")
+
+def logged_in_or_login_form():
+    """Wait condition for a first page: its pet images (logged in) or the login form (logged out) are present."""
+    return EC.any_of(EC.presence_of_element_located((By.CSS_SELECTOR, 'div.pet-dev')),
+                     EC.presence_of_element_located((By.ID, 'username')))
+
+def restore_session(driver, session_path=DEFAULT_SESSION_PATH):
+    """
+    Puts a saved session into a fresh driver before its first page load, then loads the
+    first page once to check it. Returns True if the site shows the logged-in page.
+    """
+    if not os.path.exists(session_path):
+        return False
+    try:
+        with open(session_path, "r", encoding="utf-8") as f:
+            storage_script_id = install_session(driver, json.load(f))
+
+        check_url = f"{BASE_FIRST_URL}1"
+        print(f"Checking the saved session ({session_path}) on {check_url}...")
+        try:
+            driver.get(check_url)
+            WAITS.wait("session_check", driver, logged_in_or_login_form())
+        finally:
+            driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": storage_script_id})
+        if driver.find_elements(By.ID, 'username') or not driver.find_elements(By.CSS_SELECTOR, 'div.pet-dev'):
+            print("   The saved session has expired. Logging in again.")
+            driver.delete_all_cookies()
+            driver.execute_script("window.localStorage.clear();")
+            return False
+    except Exception as e:
+        print(f"   Could not restore the saved session: {e}. Logging in again.")
+        return False
+    print("   Saved session restored; no login needed.")
+    return True
+
+def log_in(driver, session_path=DEFAULT_SESSION_PATH, fresh_login=False):
+    """
+    Restores the saved session when it is still valid (unless fresh_login), otherwise logs
+    in with YOUR_USERNAME/YOUR_PASSWORD and saves the new session. Returns True if logged in.
+    """
+    if not fresh_login and restore_session(driver, session_path):
+        return True
+
+    login_url = f"{BASE_FIRST_URL}1"
+    print(f"Attempting initial login using: {login_url}")
+    if not perform_login(driver, login_url, YOUR_USERNAME, YOUR_PASSWORD):
+        return False
+    try:
+        save_session(driver, session_path)
+    except Exception as e:
+        print(f"   Warning: Could not save the session to {session_path}: {e}")
+    return True
+
+# Browser recycling: a browser is swapped for a fresh one (carrying over the session) after
+# "pages" scraped target pages or once its JS heap exceeds "memory_mb"; 0 turns a limit off.
+# The heap comes from the DevTools performance metrics, which have no process RSS figure
+BROWSER_RECYCLING = {"pages": 0, "memory_mb": 0}
+
+class RecyclableDriver:
+    """
+    Wraps a Chrome driver so the browser behind it can be replaced in the middle of a crawl:
+    everything that holds the wrapper keeps working with the new browser. Elements found
+    in the old browser are gone after a swap, so callers re-open their page after recycling.
+    """
+    total_recycles = 0
+    recycles_lock = threading.Lock()
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages_scraped = 0
+        self.performance_enabled = False
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+    def memory_metrics(self):
+        """The browser's DevTools performance metrics that describe its memory, in MB and nodes."""
+        if not self.performance_enabled:
+            self.driver.execute_cdp_cmd("Performance.enable", {})
+            self.performance_enabled = True
+        metrics = {metric["name"]: metric["value"]
+                   for metric in self.driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]}
+        return {
+            "js_heap_mb": metrics.get("JSHeapTotalSize", 0) / 1024 / 1024,
+            "js_heap_used_mb": metrics.get("JSHeapUsedSize", 0) / 1024 / 1024,
+            "nodes": int(metrics.get("Nodes", 0)),
+        }
+
+    def recycle_reason(self):
+        """Why the browser should be recycled now, or None."""
+        if BROWSER_RECYCLING["pages"] and self.pages_scraped >= BROWSER_RECYCLING["pages"]:
+            return f"{self.pages_scraped} pages scraped"
+        if BROWSER_RECYCLING["memory_mb"]:
+            memory = self.memory_metrics()
+            if memory["js_heap_mb"] >= BROWSER_RECYCLING["memory_mb"]:
+                return f"JS heap at {memory['js_heap_mb']:.0f} MB ({memory['nodes']} DOM nodes)"
+        return None
+
+    def recycle(self, reason):
+        """Starts a fresh browser with the current session and closes the old one."""
+        print(f"\n   Recycling the browser ({reason}): starting a fresh one with the same session...")
+        session = read_session(self.driver)
+        new_driver = initialize_driver()
+        # The session script stays on, but only fills in localStorage items that are missing
+        install_session(new_driver, session)
+        old_driver = self.driver
+        self.driver = new_driver
+        self.pages_scraped = 0
+        self.performance_enabled = False
+        try:
+            old_driver.quit()
+        except Exception as e:
+            print(f"   Warning: The old browser did not close cleanly: {e}")
+        with RecyclableDriver.recycles_lock:
+            RecyclableDriver.total_recycles += 1
+
+def recycle_browser_if_due(driver):
+    """Recycles a RecyclableDriver that reached a BROWSER_RECYCLING limit. Returns True if it did."""
+    if not isinstance(driver, RecyclableDriver):
+        return False
+    try:
+        reason = driver.recycle_reason()
+    except Exception as e:
+        print(f"   Could not read the browser's memory metrics: {e}")
+        return False
+    if reason is None:
+        return False
+    driver.recycle(reason)
+    return True
+
+# Opens every collapsed card and every nested node title (each clicked once), clicking the
+# ones new levels add as they appear, and resolves once the DOM has been quiet for quietMs
+BULK_EXPAND_SCRIPT = """
+var quietMs = arguments[0], maxMs = arguments[1], done = arguments[arguments.length - 1];
+var clicked = 0;
+function expandAll() {
+    document.querySelectorAll('.col-lg-9 div[role="tablist"] > div.card.mb-1 header[role="tab"] div[role="button"][aria-expanded="false"]').forEach(function (header) {
+        header.click();
+        clicked++;
+    });
+    document.querySelectorAll('div.node-div div.node-title:not([data-scrapeking-expanded])').forEach(function (title) {
+        title.setAttribute('data-scrapeking-expanded', '1');
+        title.click();
+        clicked++;
+    });
+}
+new Promise(function (resolve) {
+    var quietTimer = null;
+    var maxTimer = null;
+    var observer = new MutationObserver(function () {
+        expandAll();
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(finish, quietMs, false);
+    });
+    function finish(timedOut) {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(maxTimer);
+        resolve({clicked: clicked, timedOut: timedOut});
+    }
+    observer.observe(document.body, {childList: true, subtree: true, attributes: true});
+    expandAll();
+    quietTimer = setTimeout(finish, quietMs, false);
+    maxTimer = setTimeout(finish, maxMs, true);
+}).then(done);
+"""
+BULK_EXPAND_QUIET_MS = 500
+BULK_EXPAND_MAX_MS = 20000
+
+# The node-divs directly below parent (not inside another node-div below it). Once the whole
+# tree is open, querySelectorAll would also return the deeper levels, which click mode
+# only renders after their parent was clicked
+NESTED_CHILD_NODES_SCRIPT = """
+var parent = arguments[0];
+var parentNode = parent.closest('div.node-div');
+return Array.from(parent.querySelectorAll('div.node-div')).filter(function (node) {
+    return node.parentElement.closest('div.node-div') === parentNode;
+});
+"""
+
+# The elements matching a selector inside a nested item that click mode finds when it reads
+# the opened item: its own content and its direct child items (still collapsed then), but
+# not the levels below those, which click mode renders only once their parent is clicked
+NESTED_ITEM_MATCHES_SCRIPT = """
+var node = arguments[0];
+return Array.from(node.querySelectorAll(arguments[1])).filter(function (element) {
+    var levels = 0;
+    for (var ancestor = element.parentElement.closest('div.node-div'); ancestor !== node; ancestor = ancestor.parentElement.closest('div.node-div')) {
+        levels++;
+    }
+    return levels < 2;
+});
+"""
+
+def find_nested_item_elements(driver, nested_item_element, selector, expanded=False):
+    """The elements of an opened nested item matching selector, as click mode finds them."""
+    if expanded:
+        return driver.execute_script(NESTED_ITEM_MATCHES_SCRIPT, nested_item_element, selector)
+    return nested_item_element.find_elements(By.CSS_SELECTOR, selector)
+
+def expand_all_collapsibles(driver):
+    """
+    Opens every card and nested item of the page with one script and waits once, until the
+    tree stops changing, instead of clicking and waiting per item.
+    """
+    # One async script call: the condition holds as soon as the script's promise resolves
+    expansion = WAITS.wait("bulk_expand", driver, lambda d: d.execute_async_script(
+        BULK_EXPAND_SCRIPT, BULK_EXPAND_QUIET_MS, BULK_EXPAND_MAX_MS))
+    if expansion["timedOut"]:
+        print(f"   Warning: Page was still changing after {BULK_EXPAND_MAX_MS} ms of bulk expansion; scraping it as it is.")
+    print(f"   Bulk-expanded {expansion['clicked']} cards and nested items.")
+
+# The pause step1 used to make after every nested click; still made when the item has not
+# settled within the nested_expand timeout
+NESTED_EXPAND_FALLBACK_SECONDS = 0.5
+
+def extract_nested_data(driver, parent_element, nested_depth=0, expanded=False):
     """
     Recursively extracts data from nested collapsible items.
     'parent_element' is the element containing the 'node-div' elements.
+    With expanded=True the items were already opened by expand_all_collapsibles and are not clicked;
+    their fields are still read from what click mode would see (see NESTED_ITEM_MATCHES_SCRIPT).
     """
     nested_items_data = []
     
     indent = "    " * (3 + nested_depth) # For console output indentation
 
     # Find all 'node-div' elements within the current parent_element.
-    all_nested_item_containers = parent_element.find_elements(By.CSS_SELECTOR, 'div.node-div')
+    if expanded:
+        all_nested_item_containers = driver.execute_script(NESTED_CHILD_NODES_SCRIPT, parent_element)
+    else:
+        all_nested_item_containers = parent_element.find_elements(By.CSS_SELECTOR, 'div.node-div')
     
     if not all_nested_item_containers:
         print(f"{indent}No more nested items found at this level.")
@@ -124,7 +475,7 @@ def extract_nested_data(driver, parent_element, nested_depth=0):
 
         try:
             # The clickable part within the container (likely div.node-title)
-            nested_header_div = WebDriverWait(nested_item_element, 5).until(
+            nested_header_div = WAITS.wait("nested_header", nested_item_element,
                 EC.presence_of_element_located((By.CSS_SELECTOR, 'div.node-title'))
             )
             # The actual content area after expansion is the `node-div` itself or a sibling `div.collapse`
@@ -149,24 +500,24 @@ def extract_nested_data(driver, parent_element, nested_depth=0):
                 pass
 
             # --- MODIFICATION: Unconditionally click the nested header ---
-            print(f"{indent}  Attempting native click on nested item {nested_data['nested_index']}...")
-            nested_header_div.click() # PERFORM NATIVE CLICK
-
-            # Wait for content to appear or for the state to change
-            try:
-                # Reduced timeout from 10 to 5 seconds
-                WebDriverWait(nested_item_element, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, 'div[role="alert"] b, b.node-label, b.node-operate, div.node-div, span.badge.badge-warning')) # Added badge-warning to expected elements
-                )
-                time.sleep(0.5) # Small stabilization pause after content appears
-                print(f"{indent}  Nested item {nested_data['nested_index']} expanded via native click.")
-            except Exception as click_wait_e:
-                print(f"{indent}  Warning: After clicking nested item {nested_data['nested_index']}, expected content not found quickly: {click_wait_e}")
-                pass
+            # (already opened, without a click per item, when the page was bulk-expanded)
+            if not expanded:
+                print(f"{indent}  Attempting native click on nested item {nested_data['nested_index']}...")
+                item_settled = SubtreeSettled(driver, nested_item_element)
+                nested_header_div.click() # PERFORM NATIVE CLICK
+
+                # Wait until what the click renders inside the item (children, trick, badge) has
+                # arrived: the item's own title already holds labels, so presence proves nothing
+                try:
+                    WAITS.wait("nested_expand", nested_item_element, item_settled)
+                    print(f"{indent}  Nested item {nested_data['nested_index']} expanded via native click.")
+                except Exception as click_wait_e:
+                    print(f"{indent}  Warning: Nested item {nested_data['nested_index']} was still changing after the click; reading it after a short pause: {click_wait_e}")
+                    time.sleep(NESTED_EXPAND_FALLBACK_SECONDS)
 
             # Scrape the "trick" text (if any) from the alert within the nested_body_element_to_scrape
             try:
-                nested_trick_element = nested_body_element_to_scrape.find_element(By.CSS_SELECTOR, 'div[role="alert"] b')
+                nested_trick_element = find_nested_item_elements(driver, nested_body_element_to_scrape, 'div[role="alert"] b', expanded)[0]
                 nested_data['nested_trick_text'] = nested_trick_element.text.strip()
                 print(f"{indent}    Nested trick text (expanded): {nested_data['nested_trick_text']}")
             except Exception:
@@ -175,7 +526,7 @@ def extract_nested_data(driver, parent_element, nested_depth=0):
 
             # --- NEW: Scrape the badge badge-warning from the nested item's body ---
             try:
-                nested_warning_badge_element = nested_body_element_to_scrape.find_element(By.CSS_SELECTOR, 'span.badge.badge-warning')
+                nested_warning_badge_element = find_nested_item_elements(driver, nested_body_element_to_scrape, 'span.badge.badge-warning', expanded)[0]
                 nested_data['nested_warning_badge_text'] = nested_warning_badge_element.text.strip()
                 print(f"{indent}    Nested warning badge text (expanded): {nested_data['nested_warning_badge_text']}")
             except Exception:
@@ -184,7 +535,7 @@ def extract_nested_data(driver, parent_element, nested_depth=0):
 
             # --- Scrape from BODY of nested item (if present after expansion) ---
             try:
-                body_labels_and_operates = nested_body_element_to_scrape.find_elements(By.CSS_SELECTOR, 'b.node-label, b.node-operate')
+                body_labels_and_operates = find_nested_item_elements(driver, nested_body_element_to_scrape, 'b.node-label, b.node-operate', expanded)
                 
                 filtered_body_elements = []
                 for el in body_labels_and_operates:
@@ -204,7 +555,7 @@ def extract_nested_data(driver, parent_element, nested_depth=0):
 
             # --- RECURSIVE CALL for further nested items ---
             print(f"{indent}  Checking for sub-nested items within {nested_data['nested_index']}...")
-            nested_data["sub_nested_items"] = extract_nested_data(driver, nested_body_element_to_scrape, nested_depth + 1)
+            nested_data["sub_nested_items"] = extract_nested_data(driver, nested_body_element_to_scrape, nested_depth + 1, expanded)
             
             # Removed the collapse logic here. The item will remain expanded.
             
@@ -219,33 +570,200 @@ def extract_nested_data(driver, parent_element, nested_depth=0):
 
     return nested_items_data
 
+# Memo key of a collapsed card: its header text plus the element skeleton and text of the
+# card body its aria-controls points to
+CARD_MEMO_KEY_SCRIPT = """
+var header = arguments[0].closest('header[role="tab"]');
+var cardBody = document.getElementById(arguments[1]);
+function collapse(element) {
+    return element.textContent.replace(/\\s+/g, ' ').trim();
+}
+return [
+    header ? collapse(header) : null,
+    cardBody ? Array.from(cardBody.querySelectorAll('*')).map(function (element) {
+        return element.tagName + '.' + (element.getAttribute('class') || '');
+    }).join(' ') : null,
+    cardBody ? collapse(cardBody) : null
+];
+"""
+
+# The [label, operate] header texts of the nested items directly below an opened card body
+# or nested item
+TOP_NESTED_TITLES_SCRIPT = """
+var parent = arguments[0];
+var parentNode = parent.closest('div.node-div');
+function text(element) {
+    return element ? (element.getClientRects().length ? element.innerText : '') : null;
+}
+return Array.from(parent.querySelectorAll('div.node-div')).filter(function (node) {
+    return node.parentElement.closest('div.node-div') === parentNode;
+}).map(function (node) {
+    var title = node.querySelector('div.node-title');
+    return title ? [text(title.querySelector('b.node-label')), text(title.querySelector('b.node-operate'))] : null;
+});
+"""
+
+def nested_tree_complete(nested_items):
+    """True if every nested item of the tree was extracted without an error."""
+    return all(item["nested_trick_text"] != "Error during processing, data not captured."
+               and nested_tree_complete(item["sub_nested_items"]) for item in nested_items)
+
+def count_nested_items(nested_items):
+    return sum(1 + count_nested_items(item["sub_nested_items"]) for item in nested_items)
+
+def nested_titles(driver, parent_element):
+    """The [label, operate] header texts of the nested items directly below parent_element, as stored."""
+    return [[script_text(title[0]), script_text(title[1])] if title else None
+            for title in driver.execute_script(TOP_NESTED_TITLES_SCRIPT, parent_element)]
+
+def memoized_titles(nested_items):
+    return [[item["nested_header_label_text"], item["nested_header_operate_text"]] for item in nested_items]
+
+class NestedTreeMemo:
+    """
+    In-run memo of the nested trees extracted from cards (opt-in with --nested_memo), keyed
+    by the card's collapsed content (see CARD_MEMO_KEY_SCRIPT). When a later card has the same key, its body is
+    still opened and checked against the memoized tree beyond what the key covers: the
+    first nested item with sub-items is opened too, and only if the items below it carry
+    the same header texts is the tree reused instead of clicking through and reading every
+    nested item again.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()  # Several browsers may extract cards at once
+        self.trees = {}
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.reused_items = 0
+
+    def card_key(self, driver, card_header, card_body_id):
+        view = driver.execute_script(CARD_MEMO_KEY_SCRIPT, card_header, card_body_id)
+        return hashlib.sha256(json.dumps(view, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def second_level_matches(self, driver, card_body_element, nested_items, expanded=False):
+        """
+        Opens the first nested item that has sub-items in the memoized tree (unless the tree
+        was bulk-expanded) and compares the header texts below it, which the collapsed card
+        the key is read from does not show yet. On a mismatch the item is closed again, so
+        it is scraped from its usual state. True when no memoized item has sub-items.
+        """
+        item_index = next((j for j, item in enumerate(nested_items) if item["sub_nested_items"]), None)
+        if item_index is None:
+            return True
+        nested_item_element = driver.execute_script(NESTED_CHILD_NODES_SCRIPT, card_body_element)[item_index]
+        nested_header_div = nested_item_element.find_element(By.CSS_SELECTOR, 'div.node-title')
+        if not expanded:
+            item_settled = SubtreeSettled(driver, nested_item_element)
+            nested_header_div.click()
+            try:
+                WAITS.wait("nested_expand", nested_item_element, item_settled)
+            except Exception:
+                time.sleep(NESTED_EXPAND_FALLBACK_SECONDS)
+        if nested_titles(driver, nested_item_element) == memoized_titles(nested_items[item_index]["sub_nested_items"]):
+            return True
+        if not expanded:
+            nested_header_div.click()
+        return False
+
+    def lookup(self, driver, key, card_body_element, expanded=False):
+        """Returns a copy of the memoized tree for key if the opened card body matches it, else None."""
+        with self.lock:
+            nested_items = self.trees.get(key)
+            if nested_items is None:
+                self.misses += 1
+                return None
 
-def extract_specific_data_from_page(driver, url):
+        try:
+            matches = (nested_titles(driver, card_body_element) == memoized_titles(nested_items)
+                       and self.second_level_matches(driver, card_body_element, nested_items, expanded))
+        except Exception as e:
+            print(f"       Could not verify the memoized nested items: {e}")
+            matches = False
+        with self.lock:
+            if not matches:
+                self.rejected += 1
+                return None
+            self.hits += 1
+            self.reused_items += count_nested_items(nested_items)
+        return copy.deepcopy(nested_items)
+
+    def store(self, key, nested_items):
+        """Memoizes a freshly extracted tree, unless part of it failed to extract."""
+        if nested_tree_complete(nested_items):
+            with self.lock:
+                self.trees[key] = copy.deepcopy(nested_items)
+
+    def report(self):
+        print(f"\n--- Nested tree memo: {self.hits} cards reused an earlier tree ({self.reused_items} nested items not re-scraped), "
+              f"{self.misses} misses, {self.rejected} rejected by verification, {len(self.trees)} distinct trees ---")
+
+
+def read_collapsed_card(driver, card_body_id, card_item_data, nested_memo=None):
+    """
+    Reads the values a card shows while it is collapsed into card_item_data.
+    Returns its clickable header and its nested memo key (None without a memo).
+    """
+    clickable_header_div = WAITS.wait("card_element", driver,
+        EC.element_to_be_clickable((By.CSS_SELECTOR, f'header[role="tab"] div[role="button"][aria-controls="{card_body_id}"]'))
+    )
+
+    parent_card_element = WAITS.wait("card_element", driver,
+        EC.presence_of_element_located((By.CSS_SELECTOR, f'div.card.mb-1:has(header[role="tab"] div[role="button"][aria-controls="{card_body_id}"])')),
+        timeout=5
+    )
+
+    print(f"     Extracting collapsed values for Main card {card_item_data['card_index']}...")
+    try:
+        poke_name_element = parent_card_element.find_element(By.CSS_SELECTOR, 'b[style*="margin-left: 5px"]')
+        card_item_data['pokemon_name'] = poke_name_element.text.strip()
+        print(f"       Pokemon Name (collapsed): {card_item_data['pokemon_name']}")
+    except Exception:
+        print(f"       Pokemon Name (collapsed): Not found.")
+        pass
+
+    try:
+        red_bold_element = parent_card_element.find_element(By.CSS_SELECTOR, 'b[style*="color: red"]')
+        card_item_data['red_bold_text'] = red_bold_element.text.strip()
+        print(f"       Red Bold Text (collapsed): {card_item_data['red_bold_text']}")
+    except Exception:
+        print(f"       Red Bold Text (collapsed): Not found.")
+        pass
+
+    try:
+        warning_badge_element = parent_card_element.find_element(By.CSS_SELECTOR, 'span.badge.badge-warning')
+        card_item_data['warning_badge_text'] = warning_badge_element.text.strip()
+        print(f"       Warning Badge Text (collapsed): {card_item_data['warning_badge_text']}")
+    except Exception:
+        print(f"       Warning Badge Text (collapsed): Not found.")
+        pass
+
+    memo_key = None
+    if nested_memo:
+        try:
+            memo_key = nested_memo.card_key(driver, clickable_header_div, card_body_id)
+        except Exception as e:
+            print(f"       Could not read the memo key of Main card {card_item_data['card_index']}: {e}")
+    return clickable_header_div, memo_key
+
+def extract_specific_data_from_page(driver, url, expansion="click"):
     """
     Extracts specific desired data points from alert boxes and collapsible cards.
     Returns the extracted data as a list of dictionaries.
     Each dictionary will contain page_x, page_y, and either card data or alert box data.
+    expansion is "click" (open cards and nested items one by one) or "bulk" (open them all first).
     """
     print(f"\n--- Extracting data from: {url} ---")
 
     all_extracted_data = []
 
-    parsed_url = urlparse(url)
-    path_segments = [s for s in parsed_url.path.split('/') if s]
-    current_x = "N/A"
-    current_y = "N/A"
-    if len(path_segments) >= 3 and path_segments[-3] == 'home': # Adjusted index for home/x/y
-        try:
-            current_x = int(path_segments[-2])
-            current_y = int(path_segments[-1])
-        except ValueError:
-            pass
+    current_x, current_y = page_xy_from_url(url)
 
     # --- Attempt to scrape alert box content ---
     alert_box_selector = 'div[role="alert"].alert-success'
     alert_box_found = False
     try:
-        alert_box_div = WebDriverWait(driver, 5).until( # Short wait for alert box
+        alert_box_div = WAITS.wait("alert_box", driver, # Short wait for alert box
             EC.presence_of_element_located((By.CSS_SELECTOR, alert_box_selector))
         )
         print(f"   Found alert box on {url}.")
@@ -279,8 +797,9 @@ def extract_specific_data_from_page(driver, url):
     try:
         card_container_wait_time = 3 if alert_box_found else 7
 
-        all_card_headers = WebDriverWait(driver, card_container_wait_time).until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, f'{card_container_selector} > div.card.mb-1 header[role="tab"] div[role="button"]'))
+        all_card_headers = WAITS.wait("card_headers", driver,
+            EC.presence_of_all_elements_located((By.CSS_SELECTOR, f'{card_container_selector} > div.card.mb-1 header[role="tab"] div[role="button"]')),
+            timeout=card_container_wait_time
         )
         
         card_ids = [header.get_attribute('aria-controls') for header in all_card_headers if header.get_attribute('aria-controls')]
@@ -297,6 +816,11 @@ def extract_specific_data_from_page(driver, url):
 
         print(f"   Found {len(card_ids)} top-level collapsible cards to process on {url}.")
 
+        # The collapsed values of every card are read before any card is opened, so bulk
+        # expansion cannot change them: once a card body is open, the first-match selectors
+        # also find the badges and texts inside it, which are hidden while it is collapsed
+        nested_memo = PAGE_SCRAPE_SETTINGS["nested_memo"]
+        collapsed_cards = []
         for i, card_body_id in enumerate(card_ids):
             card_item_data = {
                 "type": "card_data",
@@ -309,77 +833,59 @@ def extract_specific_data_from_page(driver, url):
                 "primary_trick_text": "N/A",
                 "nested_items": []
             }
-
             try:
-                clickable_header_div = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, f'header[role="tab"] div[role="button"][aria-controls="{card_body_id}"]'))
-                )
-
-                parent_card_element = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, f'div.card.mb-1:has(header[role="tab"] div[role="button"][aria-controls="{card_body_id}"])'))
-                )
-
-                print(f"     Extracting collapsed values for Main card {i+1}...")
-                try:
-                    poke_name_element = parent_card_element.find_element(By.CSS_SELECTOR, 'b[style*="margin-left: 5px"]')
-                    card_item_data['pokemon_name'] = poke_name_element.text.strip()
-                    print(f"       Pokemon Name (collapsed): {card_item_data['pokemon_name']}")
-                except Exception:
-                    print(f"       Pokemon Name (collapsed): Not found.")
-                    pass
-
-                try:
-                    red_bold_element = parent_card_element.find_element(By.CSS_SELECTOR, 'b[style*="color: red"]')
-                    card_item_data['red_bold_text'] = red_bold_element.text.strip()
-                    print(f"       Red Bold Text (collapsed): {card_item_data['red_bold_text']}")
-                except Exception:
-                    print(f"       Red Bold Text (collapsed): Not found.")
-                    pass
-
-                try:
-                    warning_badge_element = parent_card_element.find_element(By.CSS_SELECTOR, 'span.badge.badge-warning')
-                    card_item_data['warning_badge_text'] = warning_badge_element.text.strip()
-                    print(f"       Warning Badge Text (collapsed): {card_item_data['warning_badge_text']}")
-                except Exception:
-                    print(f"       Warning Badge Text (collapsed): Not found.")
-                    pass
-
+                clickable_header_div, memo_key = read_collapsed_card(driver, card_body_id, card_item_data, nested_memo)
             except Exception as e:
                 print(f"     Error in card {i+1} on page {current_x}/{current_y} (header initialization or primary element finding): {e}")
                 print(f"     Full error: {traceback.format_exc()}")
+                clickable_header_div, memo_key = None, None
+            collapsed_cards.append((card_body_id, card_item_data, clickable_header_div, memo_key))
+
+        bulk_expanded = False
+        if expansion == "bulk":
+            try:
+                expand_all_collapsibles(driver)
+                bulk_expanded = True
+            except Exception as e:
+                print(f"   Bulk expansion failed, opening the cards one by one instead: {e}")
+
+        for card_body_id, card_item_data, clickable_header_div, memo_key in collapsed_cards:
+            i = card_item_data["card_index"] - 1
+            if clickable_header_div is None:
                 all_extracted_data.append(card_item_data)
                 continue
 
             try:
-                # --- MODIFICATION: Unconditionally click the main card header ---
-                print(f"     Main card {i+1} attempting native click to expand...")
-                
-                clickable_header_div.click() # PERFORM NATIVE CLICK
-                time.sleep(1) # Add 1-second pause after click
-                time.sleep(1.5) # Allow some time for content to load after click
+                if not bulk_expanded:
+                    # --- MODIFICATION: Unconditionally click the main card header ---
+                    print(f"     Main card {i+1} attempting native click to expand...")
 
-                # Reduced timeout from 7 to 5 seconds for card expansion waits
-                WebDriverWait(driver, 5).until(
-                    EC.visibility_of_element_located((By.ID, card_body_id))
-                )
-                WebDriverWait(driver, 5).until(
-                    EC.text_to_be_present_in_element_attribute((By.CSS_SELECTOR, f'header[role="tab"] div[role="button"][aria-controls="{card_body_id}"]'), 'aria-expanded', 'true')
-                )
-                # REMOVED: WebDriverWait for presence of div.node-div or b.node-label
-                
-                time.sleep(0.5) # Small stabilization pause after content appears
-                print(f"     Main card {i+1} expanded via native click.")
-                
-                # Reduced timeout from 7 to 5 seconds for card body element visibility
-                card_body_element = WebDriverWait(driver, 5).until(
+                    clickable_header_div.click() # PERFORM NATIVE CLICK
+
+                    # Expanded once the header's aria-expanded flips and any content it loads has arrived
+                    WAITS.wait("card_expand", driver, all_of(
+                        EC.text_to_be_present_in_element_attribute((By.CSS_SELECTOR, f'header[role="tab"] div[role="button"][aria-controls="{card_body_id}"]'), 'aria-expanded', 'true'),
+                        NetworkIdle()
+                    ))
+                    # REMOVED: WebDriverWait for presence of div.node-div or b.node-label
+
+                card_body_element = WAITS.wait("card_body", driver,
                     EC.visibility_of_element_located((By.ID, card_body_id))
                 )
+                print(f"     Main card {i+1} expanded{' (bulk)' if bulk_expanded else ' via native click'}.")
 
                 card_item_data['primary_trick_text'] = "N/A"
                 print(f"       Primary Trick Text: {card_item_data['primary_trick_text']}")
 
-                print(f"     Processing nested items for Main card {i+1}...")
-                card_item_data["nested_items"] = extract_nested_data(driver, card_body_element, nested_depth=0)
+                memoized_nested_items = nested_memo.lookup(driver, memo_key, card_body_element, bulk_expanded) if memo_key else None
+                if memoized_nested_items is not None:
+                    print(f"     Nested items of Main card {i+1} match an earlier card of this run; reusing them.")
+                    card_item_data["nested_items"] = memoized_nested_items
+                else:
+                    print(f"     Processing nested items for Main card {i+1}...")
+                    card_item_data["nested_items"] = extract_nested_data(driver, card_body_element, nested_depth=0, expanded=bulk_expanded)
+                    if memo_key:
+                        nested_memo.store(memo_key, card_item_data["nested_items"])
 
                 # Removed the collapse logic here. The card will remain expanded.
 
@@ -396,170 +902,838 @@ def extract_specific_data_from_page(driver, url):
 
     return all_extracted_data
 
+# Every crawl keeps crawl_checkpoint.json in the output folder, replaced after each page:
+#   completed_pages  the (first page, target url) pages whose data is in the X files
+#   file_sizes       the length of each X file right after the last of those pages
+#   frontier         the harvested (first page, target url) list, with --frontier
+CHECKPOINT_FILENAME = "crawl_checkpoint.json"
+
+class CrawlCheckpoint:
+    """
+    Records which pages of a crawl are done, so --resume can continue where a crawl died.
+    Resuming cuts the X files back to the lengths saved with the last finished page, which
+    drops anything appended after it; those pages are not in the checkpoint and get scraped
+    again, so a crash and restart neither duplicates nor loses a page.
+    """
+
+    def __init__(self, output_base_dir, output_format):
+        self.output_base_dir = output_base_dir
+        self.output_format = output_format
+        self.path = os.path.join(output_base_dir, CHECKPOINT_FILENAME)
+        self.lock = threading.Lock()  # Pages may be checked from several browser threads
+        self.completed_pages = {}  # (first_page_num, url) -> None, in completion order
+        self.file_sizes = {}
+        self.frontier = None
+
+    def x_file_names(self):
+        suffixes = tuple(OUTPUT_FORMAT_SUFFIXES[self.output_format])
+        return [filename for filename in os.listdir(self.output_base_dir)
+                if filename.startswith("pokeking_icu_home_X_") and filename.endswith(suffixes)]
+
+    def start(self):
+        """Starts a new checkpoint. X files already in the folder are kept as they are."""
+        self.file_sizes = {filename: os.path.getsize(os.path.join(self.output_base_dir, filename))
+                           for filename in self.x_file_names()}
+        self.save()
+
+    def resume(self):
+        """
+        Loads the saved checkpoint and cuts the X files back to it.
+        Returns False if the folder has no checkpoint.
+        """
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state["output_format"] != self.output_format:
+            raise ValueError(f"The checkpoint in '{self.output_base_dir}' was written with --output_format "
+                             f"{state['output_format']}; resume with the same format.")
+        self.completed_pages = {tuple(page): None for page in state["completed_pages"]}
+        self.file_sizes = state["file_sizes"]
+        self.frontier = [tuple(item) for item in state["frontier"]] if state["frontier"] is not None else None
+
+        for filename in self.x_file_names():
+            file_path = os.path.join(self.output_base_dir, filename)
+            saved_size = self.file_sizes.get(filename, 0)
+            if os.path.getsize(file_path) > saved_size:
+                print(f"   Dropping {os.path.getsize(file_path) - saved_size} bytes appended to {filename} after the last checkpoint.")
+                with open(file_path, "r+b") as f:
+                    f.truncate(saved_size)
+        return True
+
+    def is_page_done(self, first_page_num, url):
+        with self.lock:
+            return (first_page_num, url) in self.completed_pages
+
+    def record_page(self, first_page_num, url, written_paths):
+        """Marks a page done once its data has been appended to written_paths."""
+        with self.lock:
+            for file_path in written_paths:
+                self.file_sizes[os.path.basename(file_path)] = os.path.getsize(file_path)
+            self.completed_pages[(first_page_num, url)] = None
+            self.save()
+
+    def record_frontier(self, frontier):
+        with self.lock:
+            self.frontier = list(frontier)
+            self.save()
+
+    def save(self):
+        state = {
+            "output_format": self.output_format,
+            "file_sizes": self.file_sizes,
+            "frontier": self.frontier,
+            "completed_pages": list(self.completed_pages),
+        }
+        # Written under a temporary name first so a crash never leaves a truncated checkpoint
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+def is_page_done(first_page_num, target_url):
+    """True if the run's checkpoint (see --resume) already has this page."""
+    checkpoint = PAGE_SCRAPE_SETTINGS["checkpoint"]
+    return checkpoint is not None and checkpoint.is_page_done(first_page_num, target_url)
+
+# Change detection: every target page gets a fingerprint of its collapsed view (alert text
+# and, per card, the header, pokemon name and red bold text), read before anything is
+# expanded and saved as one {"url", "fingerprint"} line of page_fingerprints.jsonl.
+# With --previous_run, a page whose fingerprint matches the previous run's is not expanded;
+# its records are copied from the previous run's .jsonl X files instead.
+PAGE_FINGERPRINTS_FILENAME = "page_fingerprints.jsonl"
+COLLAPSED_VIEW_SCRIPT = """
+function collapse(element) {
+    return element ? element.textContent.replace(/\\s+/g, ' ').trim() : null;
+}
+var alertBox = document.querySelector('div[role="alert"].alert-success');
+var cards = Array.from(document.querySelectorAll('.col-lg-9 div[role="tablist"] > div.card.mb-1')).map(function (card) {
+    return [
+        collapse(card.querySelector('header[role="tab"]')),
+        collapse(card.querySelector('b[style*="margin-left: 5px"]')),
+        collapse(card.querySelector('b[style*="color: red"]'))
+    ];
+});
+return {alert_text: collapse(alertBox), cards: cards};
+"""
+
+def collapsed_view_fingerprint(driver):
+    """The sha256 of the page's collapsed view, or None if it shows neither an alert box nor cards."""
+    view = driver.execute_script(COLLAPSED_VIEW_SCRIPT)
+    if not view["alert_text"] and not view["cards"]:
+        return None
+    return hashlib.sha256(json.dumps(view, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+def read_previous_page_records(run_dir):
+    """
+    Groups the records of a run's .jsonl X files by page url (without the url field).
+    A url scraped more than once in that run keeps the records of its first visit.
+    """
+    page_records = {}
+    for filename in os.listdir(run_dir):
+        if not (filename.startswith("pokeking_icu_home_X_") and filename.endswith(".jsonl")):
+            continue
+        finished_urls = set()
+        last_url = None
+        with open(os.path.join(run_dir, filename), "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                url = record.pop("url")
+                if url != last_url:
+                    if last_url is not None:
+                        finished_urls.add(last_url)
+                    last_url = url
+                if url not in finished_urls:
+                    page_records.setdefault(url, []).append(record)
+    return page_records
+
+def read_page_fingerprints(fingerprints_path):
+    """
+    Reads a page_fingerprints.jsonl into {url: fingerprint}. A url fingerprinted more than
+    once keeps its first fingerprint, the one of the records read_previous_page_records keeps.
+    """
+    fingerprints = {}
+    with open(fingerprints_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                fingerprints.setdefault(entry["url"], entry["fingerprint"])
+    return fingerprints
+
+class ChangeDetector:
+    """
+    Fingerprints every target page of the run and, given the previous run's folder, hands
+    back that run's records for pages whose fingerprint has not changed.
+    page_fingerprints.jsonl keeps one line per url: a rerun or --resume in the same folder
+    only adds the pages it has no fingerprint of yet, like the X files keep their records.
+    """
+
+    def __init__(self, output_base_dir, previous_run_dir=None):
+        self.fingerprints_path = os.path.join(output_base_dir, PAGE_FINGERPRINTS_FILENAME)
+        self.lock = threading.Lock()  # Several browsers may check pages at once
+        self.fingerprints = {}
+        if os.path.exists(self.fingerprints_path):
+            self.fingerprints = read_page_fingerprints(self.fingerprints_path)
+            # Files of earlier versions of step1 appended a line on every visit
+            tmp_path = f"{self.fingerprints_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for url, fingerprint in self.fingerprints.items():
+                    f.write(json.dumps({"url": url, "fingerprint": fingerprint}, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.fingerprints_path)
+        self.previous_fingerprints = {}
+        self.previous_page_records = {}
+        self.unchanged = 0
+        self.changed = 0
+        self.new = 0
+        if previous_run_dir:
+            self.load_previous_run(previous_run_dir)
+
+    def load_previous_run(self, run_dir):
+        fingerprints_path = os.path.join(run_dir, PAGE_FINGERPRINTS_FILENAME)
+        if not os.path.exists(fingerprints_path):
+            print(f"Warning: '{run_dir}' has no {PAGE_FINGERPRINTS_FILENAME}. Every page will be scraped in full.")
+            return
+        self.previous_fingerprints = read_page_fingerprints(fingerprints_path)
+        self.previous_page_records = read_previous_page_records(run_dir)
+        if not self.previous_page_records:
+            print(f"Warning: '{run_dir}' has no .jsonl X files to carry records forward from "
+                  f"(scrape with --output_format jsonl or both). Every page will be scraped in full.")
+        print(f"Change detection: {len(self.previous_fingerprints)} page fingerprints from '{run_dir}'.")
+
+    def unchanged_page_data(self, driver, url):
+        """
+        Fingerprints the (still collapsed) page the driver is on. Returns the previous run's
+        records for it when its fingerprint is unchanged, else None (scrape the page).
+        """
+        fingerprint = collapsed_view_fingerprint(driver)
+        previous_fingerprint = self.previous_fingerprints.get(url)
+        with self.lock:
+            if fingerprint is not None and url not in self.fingerprints:
+                self.fingerprints[url] = fingerprint
+                with open(self.fingerprints_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"url": url, "fingerprint": fingerprint}, ensure_ascii=False) + "\n")
+            if fingerprint is not None and fingerprint == previous_fingerprint and url in self.previous_page_records:
+                self.unchanged += 1
+                return self.previous_page_records[url]
+            if previous_fingerprint is None:
+                self.new += 1
+            else:
+                self.changed += 1
+        return None
+
+    def report(self):
+        print(f"\n--- Change detection: {self.unchanged} pages unchanged (carried forward), "
+              f"{self.changed} changed, {self.new} not in the previous run ---")
+
+# The values every card shows while it is collapsed, read before the tree is opened (the
+# first-match selectors would also find the badges and texts inside an opened card body),
+# with the same selectors as read_collapsed_card. Element text follows Selenium's .text:
+# the rendered text, or "" for an element that is not displayed
+COLLAPSED_CARDS_SCRIPT = """
+function text(element) {
+    if (!element) {
+        return null;
+    }
+    return element.getClientRects().length ? element.innerText : '';
+}
+var cardHeaders = document.querySelectorAll('.col-lg-9 div[role="tablist"] > div.card.mb-1 header[role="tab"] div[role="button"]');
+return Array.from(cardHeaders).filter(function (cardHeader) {
+    return cardHeader.getAttribute('aria-controls');
+}).map(function (cardHeader) {
+    var card = document.querySelector('div.card.mb-1:has(header[role="tab"] div[role="button"][aria-controls="' + cardHeader.getAttribute('aria-controls') + '"])');
+    return {
+        pokemon_name: card ? text(card.querySelector('b[style*="margin-left: 5px"]')) : null,
+        red_bold_text: card ? text(card.querySelector('b[style*="color: red"]')) : null,
+        warning_badge_text: card ? text(card.querySelector('span.badge.badge-warning')) : null
+    };
+});
+"""
+
+# Reads the alert box and the whole (already expanded) card tree in one call, with the same
+# selectors and first-match rules as the element-by-element path: a nested item's fields
+# only come from what click mode has rendered when it reads the item (its own content and
+# its direct children, see NESTED_ITEM_MATCHES_SCRIPT). The cards' collapsed values come
+# from COLLAPSED_CARDS_SCRIPT
+EXTRACT_PAGE_SCRIPT = """
+function text(element) {
+    if (!element) {
+        return null;
+    }
+    return element.getClientRects().length ? element.innerText : '';
+}
+function underNodeTitle(element) {
+    for (var ancestor = element.parentElement; ancestor; ancestor = ancestor.parentElement) {
+        if (ancestor.tagName === 'DIV' && ancestor.getAttribute('class') === 'node-title') {
+            return true;
+        }
+    }
+    return false;
+}
+function childNodes(parent) {
+    var parentNode = parent.closest('div.node-div');
+    return Array.from(parent.querySelectorAll('div.node-div')).filter(function (node) {
+        return node.parentElement.closest('div.node-div') === parentNode;
+    });
+}
+function nodeMatches(node, selector) {
+    return Array.from(node.querySelectorAll(selector)).filter(function (element) {
+        var levels = 0;
+        for (var ancestor = element.parentElement.closest('div.node-div'); ancestor !== node; ancestor = ancestor.parentElement.closest('div.node-div')) {
+            levels++;
+        }
+        return levels < 2;
+    });
+}
+function readNode(node) {
+    var header = node.querySelector('div.node-title');
+    if (!header) {
+        return {error: true};
+    }
+    var bodyTexts = nodeMatches(node, 'b.node-label, b.node-operate').filter(function (element) {
+        return !underNodeTitle(element);
+    }).map(text);
+    return {
+        header_label: text(header.querySelector('b.node-label')),
+        header_operate: text(header.querySelector('b.node-operate')),
+        trick: text(nodeMatches(node, 'div[role="alert"] b')[0]),
+        warning_badge: text(nodeMatches(node, 'span.badge.badge-warning')[0]),
+        body_texts: bodyTexts,
+        children: childNodes(node).map(readNode)
+    };
+}
+
+var page = {alert_box_texts: null, cards: []};
+var alertBox = document.querySelector('div[role="alert"].alert-success');
+if (alertBox) {
+    page.alert_box_texts = Array.from(alertBox.querySelectorAll('div[data-v-51cd036b]')).filter(function (element) {
+        return !Array.from(element.children).some(function (child) { return child.tagName === 'BUTTON'; });
+    }).map(text);
+}
+var cardHeaders = document.querySelectorAll('.col-lg-9 div[role="tablist"] > div.card.mb-1 header[role="tab"] div[role="button"]');
+Array.from(cardHeaders).forEach(function (cardHeader) {
+    var cardBodyId = cardHeader.getAttribute('aria-controls');
+    if (!cardBodyId) {
+        return;
+    }
+    var cardBody = document.getElementById(cardBodyId);
+    page.cards.push({
+        body_visible: !!(cardBody && cardBody.getClientRects().length),
+        nested_items: cardBody ? childNodes(cardBody).map(readNode) : []
+    });
+});
+return page;
+"""
+
+# Extraction engines: "elements" reads every field with its own WebDriver command (opening
+# cards and nested items per --expansion), "js" opens the tree in bulk and reads the whole
+# page with EXTRACT_PAGE_SCRIPT, "compare" runs both and reports where they differ
+EXTRACTION_MODES = ["elements", "js", "compare"]
+
+def extract_page_data_with_script(driver, url):
+    """
+    Same result as extract_specific_data_from_page, but opens the page's tree with
+    expand_all_collapsibles and reads it back in a single execute_script round trip
+    (plus one before, for the cards' collapsed values).
+    """
+    print(f"\n--- Extracting data (single script) from: {url} ---")
+    current_x, current_y = page_xy_from_url(url)
+
+    try:
+        WAITS.wait("alert_box", driver, EC.presence_of_element_located((By.CSS_SELECTOR,
+            'div[role="alert"].alert-success, .col-lg-9 div[role="tablist"] > div.card.mb-1 header[role="tab"] div[role="button"]')),
+            timeout=7)
+    except Exception:
+        print(f"   No data (alert box or cards) found on {url}.")
+        return []
+
+    collapsed_cards = driver.execute_script(COLLAPSED_CARDS_SCRIPT)
+    expand_all_collapsibles(driver)
+    page = driver.execute_script(EXTRACT_PAGE_SCRIPT)
+    for card, collapsed_card in zip(page["cards"], collapsed_cards):
+        card.update(collapsed_card)
+    all_extracted_data = page_data_from_script(page, current_x, current_y)
+    print(f"   Extracted {len(all_extracted_data)} alert box/card entries in one script call.")
+    return all_extracted_data
+
+def extract_page_data(driver, url, extraction="elements", expansion="click"):
+    """
+    Extracts one page with the chosen extraction engine. The single-script engine falls back
+    to the element-by-element path if it fails.
+    """
+    if extraction == "elements":
+        return extract_specific_data_from_page(driver, url, expansion)
+
+    try:
+        script_data = extract_page_data_with_script(driver, url)
+    except Exception as e:
+        print(f"   Single-script extraction failed, falling back to element-by-element extraction: {e}. Full error: {traceback.format_exc()}")
+        return extract_specific_data_from_page(driver, url, expansion)
+    if extraction == "js":
+        return script_data
+
+    # compare: click mode is the reference, and it needs the page as it loads, with every
+    # card and nested item still closed
+    driver.get(url)
+    WAITS.wait("target_content", driver, NetworkIdle())
+    elements_data = extract_specific_data_from_page(driver, url, "click")
+    if script_data == elements_data:
+        print(f"   Extraction engines agree on {url}.")
+    else:
+        print(f"   WARNING: Extraction engines differ on {url}:")
+        print(f"     single script:      {json.dumps(script_data, ensure_ascii=False)}")
+        print(f"     element by element: {json.dumps(elements_data, ensure_ascii=False)}")
+    return elements_data
+
+def scrape_current_page(driver, record_page_data, first_page_num):
+    """
+    Extracts the target page the driver is on (reached from first page first_page_num) and
+    hands its data to record_page_data, also when it has none, so the page counts as done.
+    """
+    if isinstance(driver, RecyclableDriver):
+        driver.pages_scraped += 1
+    change_detector = PAGE_SCRAPE_SETTINGS["change_detector"]
+    extracted_data_for_page = change_detector.unchanged_page_data(driver, driver.current_url) if change_detector else None
+    if extracted_data_for_page is not None:
+        print(f"     Page unchanged since the previous run; carrying its {len(extracted_data_for_page)} records forward.")
+        record_page_data(x_val_from_url(driver.current_url), extracted_data_for_page, driver.current_url, first_page_num)
+        return
+
+    extracted_data_for_page = extract_page_data(driver, driver.current_url,
+                                                PAGE_SCRAPE_SETTINGS["extraction"], PAGE_SCRAPE_SETTINGS["expansion"])
+
+    if not extracted_data_for_page:
+        print(f"     No extractable data found on {driver.current_url}. No data written to file.")
+    record_page_data(x_val_from_url(driver.current_url), extracted_data_for_page, driver.current_url, first_page_num)
+
+    # Cards and nested items are still expanded from the extraction
+    archive_current_page(driver)
+
+def archive_current_page(driver, kind="page"):
+    """Adds the page the driver is on to the HTML archive, when --archive_html is on."""
+    if not PAGE_SCRAPE_SETTINGS["archive_dir"]:
+        return
+    try:
+        sha256 = archive_page_html(PAGE_SCRAPE_SETTINGS["archive_dir"], driver.current_url,
+                                   x_val_from_url(driver.current_url), driver.page_source, kind)
+        print(f"     Archived {kind.replace('_', ' ')} as {sha256[:12]}.")
+    except Exception as e:
+        print(f"     Error archiving {driver.current_url}: {e}")
+
+def first_page_loaded():
+    """Wait condition for a first page: its pet images are present and the network has gone quiet."""
+    return all_of(EC.presence_of_element_located((By.CSS_SELECTOR, 'div.pet-dev')), NetworkIdle())
+
+def scrape_first_page(driver, first_page_num, record_page_data):
+    """
+    Opens one first page, clicks through every pet image on it and extracts each target page.
+    The data of each page is handed to record_page_data(x_val, extracted_data, url, first_page_num);
+    pages the checkpoint already has (--resume) are not clicked again.
+
+    Returns:
+        bool: True when every image was scraped (or already done), False when the first page
+        did not load or an image failed.
+    """
+    current_first_url = f"{BASE_FIRST_URL}{first_page_num}"
+    print(f"\n--- Navigating to First Page: {current_first_url} ---")
+    load_start = time.monotonic()
+    driver.get(current_first_url)
+
+    try:
+        WAITS.wait("first_page_images", driver, first_page_loaded())
+        NETWORK_USAGE.page_loaded(driver, time.monotonic() - load_start)
+        print(f"   Images loaded on {current_first_url}.")
+        archive_current_page(driver, "first_page")
+    except Exception as e:
+        print(f"   No pet-dev images found on {current_first_url} or page load issue: {e}. Full error: {traceback.format_exc()}")
+        driver.save_screenshot(f"no_images_first_{first_page_num}.png")
+        return False
+
+    all_images_scraped = True
+    num_images = len(driver.find_elements(By.CSS_SELECTOR, 'div.pet-dev'))
+    print(f"   Found {num_images} images to click on {current_first_url}.")
+
+    for i in range(num_images):
+        try:
+            if i > 0 and recycle_browser_if_due(driver):
+                # Continue with the next image of the same first page in the fresh browser
+                driver.get(current_first_url)
+                WAITS.wait("first_page_images", driver, first_page_loaded())
+
+            pet_dev_elements = WAITS.wait("first_page_images", driver,
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div.pet-dev')),
+                timeout=10
+            )
+            if i >= len(pet_dev_elements):
+                print(f"     Skipping image {i+1}: Element no longer present after re-locating.")
+                all_images_scraped = False
+                continue
+            image_to_click = pet_dev_elements[i]
+
+            link_element = None
+            try:
+                link_element = image_to_click.find_element(By.XPATH, './ancestor::a[1]')
+            except:
+                print(f"     Warning: Could not find parent <a> for image {i+1}. Skipping.")
+                continue
+
+            if link_element and link_element.tag_name == 'a':
+                relative_href = link_element.get_attribute('href')
+                target_url = urljoin(driver.current_url, relative_href)
+            else:
+                print(f"     Warning: No valid link (href) found for image {i+1} on {current_first_url}. Skipping.")
+                continue
+
+            if is_page_done(first_page_num, target_url):
+                print(f"     Skipping image {i+1}/{num_images}: {target_url} is already in the checkpoint.")
+                continue
+
+            print(f"     Clicking image {i+1}/{num_images} to go to: {target_url}")
+            load_start = time.monotonic()
+            driver.execute_script("arguments[0].click();", image_to_click)
+
+            WAITS.wait("target_navigation", driver, EC.url_to_be(target_url))
+            print(f"     Successfully navigated to: {driver.current_url}")
+
+            WAITS.wait("target_content", driver, NetworkIdle())
+            NETWORK_USAGE.page_loaded(driver, time.monotonic() - load_start)
+
+            scrape_current_page(driver, record_page_data, first_page_num)
+
+            print(f"     Going back to {current_first_url} to continue image clicks.")
+            driver.back()
+            WAITS.wait("back_navigation", driver, all_of(EC.url_to_be(current_first_url), first_page_loaded()))
+
+        except Exception as img_click_error:
+            print(f"     Error processing image {i+1} on {current_first_url}: {img_click_error}. Full error: {traceback.format_exc()}")
+            driver.save_screenshot(f"error_image_click_first_{first_page_num}_img_{i+1}.png")
+            all_images_scraped = False
+            if driver.current_url != current_first_url:
+                print(f"     Attempting to go back to {current_first_url} after error.")
+                driver.back()
+                WAITS.wait("back_navigation", driver, all_of(EC.url_to_be(current_first_url), first_page_loaded()))
+            continue
+
+    return all_images_scraped
+
+# Every pet image on a first page sits inside the <a> linking to its target page
+HARVEST_TARGET_HREFS_SCRIPT = """
+return Array.from(document.querySelectorAll('div.pet-dev')).map(function (image) {
+    var link = image.closest('a');
+    return link ? link.getAttribute('href') : null;
+});
+"""
+
+def harvest_target_urls(driver, first_page_num):
+    """Opens one first page and returns the target urls of all its images, read in one script call."""
+    current_first_url = f"{BASE_FIRST_URL}{first_page_num}"
+    print(f"\n--- Harvesting target links from First Page: {current_first_url} ---")
+    load_start = time.monotonic()
+    driver.get(current_first_url)
+
+    try:
+        WAITS.wait("first_page_images", driver, first_page_loaded())
+        NETWORK_USAGE.page_loaded(driver, time.monotonic() - load_start)
+        archive_current_page(driver, "first_page")
+    except Exception as e:
+        print(f"   No pet-dev images found on {current_first_url} or page load issue: {e}. Full error: {traceback.format_exc()}")
+        driver.save_screenshot(f"no_images_first_{first_page_num}.png")
+        return []
+
+    target_urls = []
+    for i, relative_href in enumerate(driver.execute_script(HARVEST_TARGET_HREFS_SCRIPT)):
+        if not relative_href:
+            print(f"     Warning: Could not find parent <a> for image {i+1}. Skipping.")
+            continue
+        target_urls.append(urljoin(driver.current_url, relative_href))
+    print(f"   Harvested {len(target_urls)} target links on {current_first_url}.")
+    return target_urls
+
+def build_url_frontier(driver, first_page_nums):
+    """
+    Harvests the target urls of all first pages, keeping each url once, in the order
+    a click-through crawl would first reach it.
+
+    Returns:
+        list: (first_page_num, target_url) pairs, with the first page the url was first found on.
+    """
+    frontier = {}  # dicts keep insertion order, so this dedupes without reordering
+    harvested_count = 0
+    for first_page_num in first_page_nums:
+        for target_url in harvest_target_urls(driver, first_page_num):
+            frontier.setdefault(target_url, first_page_num)
+            harvested_count += 1
+    print(f"\nURL frontier: {len(frontier)} unique target pages ({harvested_count - len(frontier)} duplicate links skipped).")
+    return [(first_page_num, target_url) for target_url, first_page_num in frontier.items()]
+
+def scrape_target_url(driver, frontier_item, record_page_data):
+    """
+    Navigates straight to one (first_page_num, target_url) target page and extracts it, without
+    going through its first page. Returns False when the page could not be scraped.
+    """
+    first_page_num, target_url = frontier_item
+    if is_page_done(first_page_num, target_url):
+        print(f"     Skipping {target_url}: already in the checkpoint.")
+        return True
+    try:
+        recycle_browser_if_due(driver)
+        print(f"     Navigating to: {target_url}")
+        load_start = time.monotonic()
+        driver.get(target_url)
+
+        WAITS.wait("target_content", driver, NetworkIdle())
+        NETWORK_USAGE.page_loaded(driver, time.monotonic() - load_start)
+
+        scrape_current_page(driver, record_page_data, first_page_num)
+    except Exception as e:
+        print(f"     Error processing {target_url}: {e}. Full error: {traceback.format_exc()}")
+        return False
+    return True
+
+def write_scraped_page(output_base_dir, output_format, written_x_categories, x_val, extracted_data, url, first_page_num):
+    """Appends one scraped page to its X file(s), then records it in the checkpoint (if any)."""
+    written_paths = write_page_data(output_base_dir, x_val, extracted_data, url, output_format)
+    for file_path in written_paths:
+        print(f"     Appended data for X={x_val} to {file_path}")
+    if written_paths:
+        written_x_categories.add(x_val)
+    if PAGE_SCRAPE_SETTINGS["checkpoint"]:
+        PAGE_SCRAPE_SETTINGS["checkpoint"].record_page(first_page_num, url, written_paths)
+
+def run_page_data_writer(write_queue, output_base_dir, output_format, written_x_categories):
+    """
+    Single writer for all X files: appends queued (x_val, extracted_data, url, first_page_num)
+    pages until it receives None, so pages scraped by different browsers never interleave
+    inside a file.
+    """
+    while True:
+        page = write_queue.get()
+        if page is None:
+            return
+        x_val, extracted_data, url, first_page_num = page
+        try:
+            write_scraped_page(output_base_dir, output_format, written_x_categories,
+                               x_val, extracted_data, url, first_page_num)
+        except Exception as e:
+            print(f"     Error writing data for X={x_val} from {url}: {e}. Full error: {traceback.format_exc()}")
+
+def crawl_with_browser_pool(login_driver, work_items, scrape_work_item, num_browsers, output_base_dir, output_format):
+    """
+    Scrapes the work items (first page numbers, or frontier items in frontier mode) with
+    num_browsers drivers at once, calling scrape_work_item(driver, item, record_page_data).
+    login_driver is already logged in; the other drivers reuse its session cookies instead
+    of logging in again. Items are handed out from a shared queue and one writer thread
+    appends all the scraped pages.
+
+    Returns:
+        set: The X categories data was written for.
+    """
+    work_queue = queue.Queue()
+    for work_item in work_items:
+        work_queue.put(work_item)
+
+    written_x_categories = set()
+    write_queue = queue.Queue()
+    writer_thread = threading.Thread(target=run_page_data_writer,
+                                     args=(write_queue, output_base_dir, output_format, written_x_categories))
+    writer_thread.start()
+
+    def record_page_data(x_val, extracted_data, url, first_page_num):
+        write_queue.put((x_val, extracted_data, url, first_page_num))
+
+    def crawl_worker(browser_num, driver):
+        while True:
+            try:
+                work_item = work_queue.get_nowait()
+            except queue.Empty:
+                return
+            print(f"\n[Browser {browser_num}] Taking {work_item}.")
+            try:
+                scrape_work_item(driver, work_item, record_page_data)
+            except Exception as e:
+                print(f"[Browser {browser_num}] Error scraping {work_item}: {e}. Full error: {traceback.format_exc()}")
+
+    extra_drivers = []
+    try:
+        drivers = [login_driver]
+        session = read_session(login_driver)
+        for browser_num in range(2, num_browsers + 1):
+            print(f"Starting browser {browser_num}/{num_browsers} with the logged-in session...")
+            extra_driver = RecyclableDriver(initialize_driver())
+            extra_drivers.append(extra_driver)
+            # Cookies and localStorage, as a recycled browser gets them; the session script
+            # stays on, but only fills in localStorage items that are missing
+            install_session(extra_driver, session)
+            drivers.append(extra_driver)
+
+        worker_threads = [threading.Thread(target=crawl_worker, args=(browser_num, driver))
+                          for browser_num, driver in enumerate(drivers, start=1)]
+        for worker_thread in worker_threads:
+            worker_thread.start()
+        for worker_thread in worker_threads:
+            worker_thread.join()
+    finally:
+        write_queue.put(None)
+        writer_thread.join()
+        for extra_driver in extra_drivers:
+            extra_driver.quit()
+
+    return written_x_categories
+
 # The __main__ block for command-line arguments
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Scrape data from pokeking.icu and save it to a custom folder.")
     parser.add_argument("folder_name", type=str, help="The name for the output folder (e.g., 'Pokemon_Data_Run_1').")
+    parser.add_argument("--output_format", choices=sorted(OUTPUT_FORMAT_SUFFIXES), default="both",
+                        help="Write the X files as human-readable 'text' (.txt), structured 'jsonl' (.jsonl, read natively by step2), or 'both' (default).")
+    parser.add_argument("--browsers", type=int, default=1,
+                        help="Number of headless browsers scraping first pages (target pages with --frontier) in parallel, sharing one login (default: 1).")
+    parser.add_argument("--frontier", action="store_true",
+                        help="Collect every target link of all first pages first (each page once), then open the target pages directly instead of clicking images and going back.")
+    parser.add_argument("--wait_mode", choices=WAIT_MODES, default="dom",
+                        help="'dom' waits on page conditions only (default), 'adaptive' also shortens timeouts to the latencies seen during the run, 'fixed' adds the old fixed sleeps back.")
+    parser.add_argument("--wait_poll", type=float, default=DEFAULT_POLL_FREQUENCY,
+                        help=f"Seconds between checks of a wait condition (default: {DEFAULT_POLL_FREQUENCY}).")
+    parser.add_argument("--wait_timeout_scale", type=float, default=1.0,
+                        help="Multiplies every wait timeout, e.g. 2 for a slow connection (default: 1.0).")
+    parser.add_argument("--expansion", choices=EXPANSION_MODES, default="click",
+                        help="'click' opens cards and nested items one by one (default); 'bulk' opens the whole tree with one script and a single wait.")
+    parser.add_argument("--extraction", choices=EXTRACTION_MODES, default="elements",
+                        help="'elements' reads each field with its own browser command (default); 'js' opens the tree in bulk and reads the whole page in one script call; 'compare' runs both and reports differences.")
+    parser.add_argument("--archive_html", action="store_true",
+                        help=f"Also save every expanded page (gzip, stored once per distinct content) in '{ARCHIVE_DIRNAME}' in the output folder, for re-extraction without a browser (step1_page_archive.py).")
+    parser.add_argument("--previous_run", default=None,
+                        help="An earlier run folder (scraped with .jsonl output): pages whose collapsed view has not changed since then are not expanded, their records are copied from it.")
+    parser.add_argument("--full_refresh", action="store_true",
+                        help="Expand and extract every page even with --previous_run, as --archive_html always does (fingerprints are still saved for the next run).")
+    parser.add_argument("--nested_memo", action="store_true",
+                        help="Reuse the nested items of an earlier card of the run when a card has the same collapsed content and nested headers, instead of scraping them (faster; tricks, badges and deeper levels are not re-read, so they can differ from a full scrape).")
+    parser.add_argument("--browser_profile", choices=sorted(BROWSER_PROFILES), default="default",
+                        help="'default' starts Chrome as before; 'lean' blocks images, fonts, media and analytics and turns off extensions and the GPU.")
+    parser.add_argument("--block", default=None,
+                        help=f"Comma-separated resource types to block instead of the profile's ({','.join(sorted(RESOURCE_TYPE_PATTERNS))}), or '' for none.")
+    parser.add_argument("--block_pattern", action="append", default=[],
+                        help="Also block requests to urls matching this pattern (* wildcards, e.g. '*hm.baidu.com*'). Can be repeated.")
+    parser.add_argument("--report_bandwidth", action="store_true",
+                        help="Record Chrome's performance log to report the MB downloaded and requests made (on anyway with a --browser_profile other than 'default' or anything blocked).")
+    parser.add_argument("--session_file", default=DEFAULT_SESSION_PATH,
+                        help=f"Where the logged-in session is saved and restored from, instead of logging in every run (default: {DEFAULT_SESSION_PATH}).")
+    parser.add_argument("--fresh_login", action="store_true",
+                        help="Log in with the credentials even if a saved session is still valid (the new session is saved).")
+    parser.add_argument("--recycle_pages", type=int, default=0,
+                        help="Replace each browser with a fresh one (same session, same place in the crawl) after this many target pages (default: 0, never).")
+    parser.add_argument("--recycle_memory_mb", type=float, default=0,
+                        help="Replace a browser once its JS heap (DevTools performance metrics) reaches this many MB (default: 0, never).")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Continue the crawl recorded in '{CHECKPOINT_FILENAME}' in the output folder: skip the pages already done and drop anything written after the last one.")
     args = parser.parse_args()
 
+    if args.browsers < 1:
+        parser.error("--browsers must be at least 1.")
+    if args.recycle_pages < 0 or args.recycle_memory_mb < 0:
+        parser.error("--recycle_pages and --recycle_memory_mb cannot be negative.")
+    BROWSER_RECYCLING["pages"] = args.recycle_pages
+    BROWSER_RECYCLING["memory_mb"] = args.recycle_memory_mb
+    if args.wait_poll <= 0 or args.wait_timeout_scale <= 0:
+        parser.error("--wait_poll and --wait_timeout_scale must be positive.")
+    WAITS.configure(args.wait_mode, args.wait_poll, args.wait_timeout_scale)
+    PAGE_SCRAPE_SETTINGS["expansion"] = args.expansion
+    PAGE_SCRAPE_SETTINGS["extraction"] = args.extraction
+    try:
+        BROWSER_PROFILE.configure(args.browser_profile,
+                                  None if args.block is None else [t for t in args.block.split(",") if t],
+                                  args.block_pattern, args.report_bandwidth)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Browser profile: {BROWSER_PROFILE.describe()}")
+
+    if args.previous_run and os.path.abspath(args.previous_run) == os.path.abspath(args.folder_name):
+        parser.error("--previous_run must be another run folder than the output folder.")
+
+    require_credentials()
+
     output_base_dir = args.folder_name
     os.makedirs(output_base_dir, exist_ok=True)
+    if args.archive_html:
+        PAGE_SCRAPE_SETTINGS["archive_dir"] = os.path.join(output_base_dir, ARCHIVE_DIRNAME)
 
-    base_first_url = "http://www.pokeking.icu/king/tree/first/"
+    checkpoint = CrawlCheckpoint(output_base_dir, args.output_format)
+    if args.resume:
+        try:
+            resumed = checkpoint.resume()
+        except ValueError as e:
+            parser.error(str(e))
+        if resumed:
+            print(f"Resuming the crawl in '{output_base_dir}': {len(checkpoint.completed_pages)} pages already done.")
+        else:
+            print(f"No checkpoint found in '{output_base_dir}'. Starting a new crawl.")
+            checkpoint.start()
+    else:
+        if os.path.exists(checkpoint.path):
+            print(f"Starting a new crawl in '{output_base_dir}' (use --resume to continue the previous one instead).")
+        checkpoint.start()
+    PAGE_SCRAPE_SETTINGS["checkpoint"] = checkpoint
+    if args.archive_html and args.previous_run and not args.full_refresh:
+        # Carried-forward pages are not expanded, so the archive would not have them
+        print("Unchanged pages are not carried forward with --archive_html, so every page of the run is archived.")
+    compare_with_run = None if args.full_refresh or args.archive_html else args.previous_run
+    PAGE_SCRAPE_SETTINGS["change_detector"] = ChangeDetector(output_base_dir, compare_with_run)
+    if args.archive_html and args.nested_memo:
+        # Reused trees are not clicked open, so the archived page would miss their contents
+        print("Nested tree memo is off with --archive_html, so every archived page is fully expanded.")
+    elif args.nested_memo:
+        PAGE_SCRAPE_SETTINGS["nested_memo"] = NestedTreeMemo()
 
     driver = None
     written_x_categories = set()
 
     try:
-        driver = initialize_driver()
+        start_time = time.monotonic()
+        driver = RecyclableDriver(initialize_driver())
 
-        initial_login_url = "http://www.pokeking.icu/king/tree/first/1"
-        print(f"Attempting initial login using: {initial_login_url}")
-        login_successful = perform_login(driver, initial_login_url, YOUR_USERNAME, YOUR_PASSWORD)
+        login_successful = log_in(driver, args.session_file, args.fresh_login)
 
         if not login_successful:
             print("\n--- Script finished. Login failed. Browser is still open for inspection. ---")
             input("Login failed. Press Enter to manually close the browser and exit script...")
             exit()
 
-        print("\nLogin successful!")
+        print(f"\nLogin successful! Browser ready after {time.monotonic() - start_time:.1f} s.")
 
-        for first_page_num in range(1, 26 + 1):
-            current_first_url = f"{base_first_url}{first_page_num}"
-            print(f"\n--- Navigating to First Page: {current_first_url} ---")
-            driver.get(current_first_url)
-            time.sleep(3)
-
-            try:
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, 'div.pet-dev'))
-                )
-                print(f"   Images loaded on {current_first_url}.")
-            except Exception as e:
-                print(f"   No pet-dev images found on {current_first_url} or page load issue: {e}. Full error: {traceback.format_exc()}")
-                driver.save_screenshot(f"no_images_first_{first_page_num}.png")
-                continue
+        work_items = range(1, NUM_FIRST_PAGES + 1)
+        scrape_work_item = scrape_first_page
+        if args.frontier:
+            if checkpoint.frontier is None:
+                checkpoint.record_frontier(build_url_frontier(driver, work_items))
+            else:
+                print(f"Reusing the URL frontier of the checkpoint ({len(checkpoint.frontier)} target pages).")
+            work_items = checkpoint.frontier
+            scrape_work_item = scrape_target_url
 
-            num_images = len(driver.find_elements(By.CSS_SELECTOR, 'div.pet-dev'))
-            print(f"   Found {num_images} images to click on {current_first_url}.")
+        if args.browsers > 1:
+            written_x_categories = crawl_with_browser_pool(driver, work_items, scrape_work_item, args.browsers,
+                                                           output_base_dir, args.output_format)
+        else:
+            def record_page_data(x_val, extracted_data, url, first_page_num):
+                write_scraped_page(output_base_dir, args.output_format, written_x_categories,
+                                   x_val, extracted_data, url, first_page_num)
 
-            for i in range(num_images):
-                try:
-                    pet_dev_elements = WebDriverWait(driver, 10).until(
-                        EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div.pet-dev'))
-                    )
-                    if i >= len(pet_dev_elements):
-                        print(f"     Skipping image {i+1}: Element no longer present after re-locating.")
-                        continue
-                    image_to_click = pet_dev_elements[i]
-
-                    link_element = None
-                    try:
-                        link_element = image_to_click.find_element(By.XPATH, './ancestor::a[1]')
-                    except:
-                        print(f"     Warning: Could not find parent <a> for image {i+1}. Skipping.")
-                        continue
-
-                    if link_element and link_element.tag_name == 'a':
-                        relative_href = link_element.get_attribute('href')
-                        target_url = urljoin(driver.current_url, relative_href)
-                    else:
-                        print(f"     Warning: No valid link (href) found for image {i+1} on {current_first_url}. Skipping.")
-                        continue
-
-                    print(f"     Clicking image {i+1}/{num_images} to go to: {target_url}")
-                    driver.execute_script("arguments[0].click();", image_to_click)
-
-                    WebDriverWait(driver, 20).until(EC.url_to_be(target_url))
-                    print(f"     Successfully navigated to: {driver.current_url}")
-
-                    time.sleep(3)
-
-                    parsed_target_url = urlparse(driver.current_url)
-                    path_segments_target = [s for s in parsed_target_url.path.split('/') if s]
-                    x_val_from_link = "unknown_x"
-                    try:
-                        if len(path_segments_target) >= 3 and path_segments_target[-3] == 'home':
-                            x_val_from_link = int(path_segments_target[-2])
-                    except ValueError:
-                            pass
-
-                    extracted_data_for_page = extract_specific_data_from_page(driver, driver.current_url)
-
-                    if extracted_data_for_page:
-                        file_name = f"pokeking_icu_home_X_{x_val_from_link}_data.txt"
-                        file_path = os.path.join(output_base_dir, file_name)
-
-                        formatted_output_lines = []
-                        for data_item in extracted_data_for_page:
-                            formatted_output_lines.append("=" * 10 + f" Data from page {data_item.get('page_x', 'N/A')}/{data_item.get('page_y', 'N/A')} " + "=" * 10)
-
-                            if data_item.get("type") == "alert_box_data":
-                                formatted_output_lines.append(f"--- Alert Box Data ---")
-                                for text in data_item.get("alert_box_texts", []):
-                                    formatted_output_lines.append(f"   Alert Text: {text}")
-                            elif data_item.get("type") == "card_data":
-                                formatted_output_lines.append(f"--- Card Entry (Card {data_item.get('card_index', 'N/A')}) ---")
-
-                                formatted_output_lines.append(f"pokemon_name: {data_item.get('pokemon_name', 'N/A')}")
-                                formatted_output_lines.append(f"red_bold_text: {data_item.get('red_bold_text', 'N/A')}")
-                                formatted_output_lines.append(f"warning_badge_text: {data_item.get('warning_badge_text', 'N/A')}")
-                                formatted_output_lines.append(f"primary_trick_text: {data_item.get('primary_trick_text', 'N/A')}")
-
-                                # Helper function to format nested items
-                                def format_nested(nested_list, depth=0):
-                                    nested_lines = []
-                                    indent_str = "  " * (depth + 1)
-                                    if nested_list:
-                                        nested_lines.append(f"{indent_str}--- Nested Items ({len(nested_list)}) ---")
-                                        for nested_entry in nested_list:
-                                            nested_lines.append(f"{indent_str}   Nested Item {nested_entry.get('nested_index', 'N/A')}:")
-                                            nested_lines.append(f"{indent_str}     nested_header_label_text (collapsed): {nested_entry.get('nested_header_label_text', 'N/A')}")
-                                            nested_lines.append(f"{indent_str}     nested_header_operate_text (collapsed): {nested_entry.get('nested_header_operate_text', 'N/A')}")
-                                            nested_lines.append(f"{indent_str}     nested_trick_text (expanded): {nested_entry.get('nested_trick_text', 'N/A')}")
-                                            nested_lines.append(f"{indent_str}     nested_body_label_text (expanded): {nested_entry.get('nested_body_label_text', 'N/A')}")
-                                            nested_lines.append(f"{indent_str}     nested_body_operate_text (expanded): {nested_entry.get('nested_body_operate_text', 'N/A')}")
-                                            nested_lines.append(f"{indent_str}     nested_warning_badge_text (expanded): {nested_entry.get('nested_warning_badge_text', 'N/A')}") # Added this line
-                                            
-                                            # Recursively format sub-nested items
-                                            sub_nested_data = nested_entry.get('sub_nested_items', [])
-                                            nested_lines.extend(format_nested(sub_nested_data, depth + 1))
-                                            nested_lines.append(f"{indent_str}   --------------------")
-                                    return nested_lines
-
-                                formatted_output_lines.extend(format_nested(data_item.get('nested_items', []))) # Changed to call the helper function
-
-                                formatted_output_lines.append("-" * 30)
-
-                        final_output_string = "\n".join(formatted_output_lines)
-
-                        with open(file_path, "a", encoding="utf-8") as f:
-                            f.write(final_output_string + "\n\n")
-                        print(f"     Appended data for X={x_val_from_link} to {file_path}")
-                        written_x_categories.add(x_val_from_link)
-                    else:
-                        print(f"     No extractable data found on {driver.current_url}. No data written to file.")
-
-                    print(f"     Going back to {current_first_url} to continue image clicks.")
-                    driver.back()
-                    WebDriverWait(driver, 10).until(EC.url_to_be(current_first_url))
-                    time.sleep(2)
-
-                except Exception as img_click_error:
-                    print(f"     Error processing image {i+1} on {current_first_url}: {img_click_error}. Full error: {traceback.format_exc()}")
-                    driver.save_screenshot(f"error_image_click_first_{first_page_num}_img_{i+1}.png")
-                    if driver.current_url != current_first_url:
-                        print(f"     Attempting to go back to {current_first_url} after error.")
-                        driver.back()
-                        WebDriverWait(driver, 10).until(EC.url_to_be(current_first_url))
-                        time.sleep(2)
-                    continue
+            for work_item in work_items:
+                scrape_work_item(driver, work_item, record_page_data)
 
         print(f"\n--- Script execution complete. Data saved in '{output_base_dir}' folder for X categories: {sorted(list(written_x_categories))}. ---")
 
     except Exception as main_error:
         print(f"An unexpected error occurred during the main scraping process: {main_error}. Full error: {traceback.format_exc()}")
     finally:
+        WAITS.report()
+        NETWORK_USAGE.report(BROWSER_PROFILE)
+        if RecyclableDriver.total_recycles:
+            print(f"\n--- Browsers recycled {RecyclableDriver.total_recycles} times ---")
+        PAGE_SCRAPE_SETTINGS["change_detector"].report()
+        if PAGE_SCRAPE_SETTINGS["nested_memo"]:
+            PAGE_SCRAPE_SETTINGS["nested_memo"].report()
         if driver:
             print("\n--- Browser is still open for inspection. ---")
             print(f"Scraped data saved in the '{output_base_dir}' folder.")
@@ -0,0 +1,372 @@
+# cmd prompt ex:
+# python step1_shard_crawl.py plan \\fileserver\scrapeking_work
+# python step1_shard_crawl.py plan \\fileserver\scrapeking_work --frontier   (one item per target page instead of per first page; logs in to read the links)
+# python step1_shard_crawl.py work \\fileserver\scrapeking_work      (on every node, with YOUR_USERNAME/YOUR_PASSWORD set as for step1)
+# python step1_shard_crawl.py merge \\fileserver\scrapeking_work directory_name
+# several local "work" processes on one shared folder can stand in for several nodes
+
+import os
+import json
+import time
+import socket
+import argparse
+import itertools
+import traceback
+
+import step1_scrapepokeking as step1
+
+# Work directory layout (must be on a filesystem where os.rename is atomic):
+#   pending/<item_id>.json   work items nobody has claimed yet
+#   claimed/<item_id>.json   items a worker is scraping; the file mtime is the lease heartbeat
+#   done/<item_id>.json      finished items
+#   failed/<item_id>.json    items that still failed after max_attempts tries
+#   shards/<item_id>.jsonl   the pages scraped for a finished (or failed) item, one JSON record per page
+#   shards/<item_id>.<worker_id>.partial   a shard still being written
+PENDING_DIR = "pending"
+CLAIMED_DIR = "claimed"
+DONE_DIR = "done"
+FAILED_DIR = "failed"
+SHARDS_DIR = "shards"
+ITEM_SUFFIX = ".json"
+SHARD_SUFFIX = ".jsonl"
+
+# A claimed item whose heartbeat is older than this is handed out again
+DEFAULT_LEASE_SECONDS = 600
+# An item that fails (first page not loading, an image or target page failing) goes back to
+# pending until it has been tried this many times
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def work_subdir(work_dir, name):
+    return os.path.join(work_dir, name)
+
+
+def write_item(work_dir, item_path, item):
+    # Written under a temporary name first so workers never see a half-written item
+    tmp_path = os.path.join(work_dir, os.path.basename(item_path) + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(item, f)
+    os.replace(tmp_path, item_path)
+
+
+def plan_items(work_dir, items):
+    """
+    Writes the (item_id, item) work items into pending/. Items that already exist in any
+    state are left alone, so planning twice is harmless.
+
+    Returns:
+        int: The number of newly planned items.
+    """
+    for name in (PENDING_DIR, CLAIMED_DIR, DONE_DIR, FAILED_DIR, SHARDS_DIR):
+        os.makedirs(work_subdir(work_dir, name), exist_ok=True)
+
+    planned_count = 0
+    for item_id, item in items:
+        filename = item_id + ITEM_SUFFIX
+        if any(os.path.exists(os.path.join(work_subdir(work_dir, name), filename))
+               for name in (PENDING_DIR, CLAIMED_DIR, DONE_DIR, FAILED_DIR)):
+            continue
+        write_item(work_dir, os.path.join(work_subdir(work_dir, PENDING_DIR), filename), item)
+        planned_count += 1
+
+    print(f"Planned {planned_count} new work items in '{work_dir}'.")
+    return planned_count
+
+
+def plan_work_items(work_dir, first_page_nums):
+    """Plans one work item per first page; its worker clicks through every image on it."""
+    return plan_items(work_dir, ((f"first_{first_page_num:03d}",
+                                  {"kind": "first_page", "first_page_num": first_page_num,
+                                   "url": f"{step1.BASE_FIRST_URL}{first_page_num}"})
+                                 for first_page_num in first_page_nums))
+
+
+def plan_frontier_items(work_dir, frontier):
+    """
+    Plans one work item per (first_page_num, target_url) of a URL frontier (see
+    step1.build_url_frontier), so a failed page is retried on its own. frontier_index keeps
+    the frontier order for the merge.
+    """
+    return plan_items(work_dir, ((f"target_{frontier_index:05d}",
+                                  {"kind": "target_url", "first_page_num": first_page_num, "url": target_url,
+                                   "frontier_index": frontier_index})
+                                 for frontier_index, (first_page_num, target_url) in enumerate(frontier)))
+
+
+def release_expired_leases(work_dir, lease_seconds):
+    """Moves claimed items whose worker stopped renewing the lease back to pending."""
+    claimed_dir = work_subdir(work_dir, CLAIMED_DIR)
+    expiry_time = time.time() - lease_seconds
+    for filename in os.listdir(claimed_dir):
+        claimed_path = os.path.join(claimed_dir, filename)
+        try:
+            if os.path.getmtime(claimed_path) >= expiry_time:
+                continue
+            os.rename(claimed_path, os.path.join(work_subdir(work_dir, PENDING_DIR), filename))
+            print(f"Lease on work item '{filename}' expired; it is pending again.")
+        except OSError:
+            # Finished, or released by another worker, in the meantime
+            pass
+
+
+def claim_work_item(work_dir, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Claims the next pending work item by renaming it into claimed/; only one worker's
+    rename can succeed, so an item is never scraped twice at the same time.
+
+    Returns:
+        tuple: (item_id, item dict), or None when there is nothing left to claim.
+    """
+    release_expired_leases(work_dir, lease_seconds)
+    pending_dir = work_subdir(work_dir, PENDING_DIR)
+    for filename in sorted(os.listdir(pending_dir)):
+        if not filename.endswith(ITEM_SUFFIX):
+            continue
+        pending_path = os.path.join(pending_dir, filename)
+        claimed_path = os.path.join(work_subdir(work_dir, CLAIMED_DIR), filename)
+        try:
+            # The lease starts now, not when the item was planned: a rename keeps the mtime, so
+            # it is refreshed first, or another worker could release the claim as expired at once
+            os.utime(pending_path)
+            os.rename(pending_path, claimed_path)
+        except OSError:
+            # Another worker claimed it first
+            continue
+        try:
+            with open(claimed_path, "r", encoding="utf-8") as f:
+                return filename[:-len(ITEM_SUFFIX)], json.load(f)
+        except OSError:
+            # The claim was lost (released as expired and claimed again) before it was read
+            continue
+    return None
+
+
+def renew_lease(claimed_path):
+    try:
+        os.utime(claimed_path)
+    except OSError:
+        # The lease expired and the item was handed out again; the shard rename still wins last
+        pass
+
+
+def scrape_work_item(driver, work_dir, item_id, item, worker_id, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Scrapes one claimed work item into its own shard file, then marks the item done.
+    Each page record keeps its position (first page, click or frontier order) for the merge.
+    A failed item goes back to pending (its shard is dropped) until it has been tried
+    max_attempts times; then it is moved to failed/ with the pages its last try scraped.
+    """
+    claimed_path = os.path.join(work_subdir(work_dir, CLAIMED_DIR), item_id + ITEM_SUFFIX)
+    shards_dir = work_subdir(work_dir, SHARDS_DIR)
+    partial_path = os.path.join(shards_dir, f"{item_id}.{worker_id}.partial")
+    first_page_num = item["first_page_num"]
+    first_seq = item.get("frontier_index", 0)
+    page_seq = itertools.count(first_seq)
+
+    with open(partial_path, "w", encoding="utf-8") as f:
+        def record_page_data(x_val, extracted_data, url, first_page_num):
+            renew_lease(claimed_path)
+            if not extracted_data:
+                return
+            f.write(json.dumps({"x": x_val, "first_page_num": first_page_num, "seq": next(page_seq),
+                                "url": url, "data": extracted_data}, ensure_ascii=False) + "\n")
+            f.flush()
+
+        if item["kind"] == "target_url":
+            scraped = step1.scrape_target_url(driver, (first_page_num, item["url"]), record_page_data)
+        else:
+            scraped = step1.scrape_first_page(driver, first_page_num, record_page_data)
+
+    attempts = item.get("attempts", 0) + 1
+    if not scraped:
+        write_item(work_dir, claimed_path, {**item, "attempts": attempts})
+        if attempts < max_attempts:
+            os.remove(partial_path)
+            try:
+                os.rename(claimed_path, os.path.join(work_subdir(work_dir, PENDING_DIR), item_id + ITEM_SUFFIX))
+            except OSError:
+                # Released as expired in the meantime
+                pass
+            print(f"Work item '{item_id}' failed (attempt {attempts}/{max_attempts}); it is pending again.")
+            return
+
+    os.replace(partial_path, os.path.join(shards_dir, item_id + SHARD_SUFFIX))
+    finished_dir = work_subdir(work_dir, DONE_DIR if scraped else FAILED_DIR)
+    os.makedirs(finished_dir, exist_ok=True)  # Work directories planned before failed/ existed
+    try:
+        os.rename(claimed_path, os.path.join(finished_dir, item_id + ITEM_SUFFIX))
+    except OSError:
+        print(f"   Work item '{item_id}' was handed out again while this worker scraped it.")
+    if scraped:
+        print(f"Finished work item '{item_id}' ({next(page_seq) - first_seq} pages).")
+    else:
+        print(f"Warning: work item '{item_id}' failed {attempts} times; moved to {FAILED_DIR} with the "
+              f"{next(page_seq) - first_seq} pages its last try scraped.")
+
+
+def run_shard_worker(work_dir, lease_seconds=DEFAULT_LEASE_SECONDS, worker_id=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Logs in once, then claims and scrapes work items until none are left."""
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    print(f"Shard worker '{worker_id}' using work directory '{work_dir}'.")
+
+    driver = None
+    try:
+        driver = step1.RecyclableDriver(step1.initialize_driver())
+        if not step1.log_in(driver):
+            print("Login failed; this worker claims no work.")
+            return
+
+        claimed_count = 0
+        while True:
+            claimed = claim_work_item(work_dir, lease_seconds)
+            if claimed is None:
+                break
+            item_id, item = claimed
+            claimed_count += 1
+            print(f"\nClaimed work item '{item_id}': {item['url']}")
+            try:
+                scrape_work_item(driver, work_dir, item_id, item, worker_id, max_attempts)
+            except Exception as e:
+                # The lease runs out and another worker picks the item up again
+                print(f"Error scraping work item '{item_id}': {e}. Full error: {traceback.format_exc()}")
+
+        print(f"\nNo work items left. Worker '{worker_id}' processed {claimed_count} items.")
+    finally:
+        step1.WAITS.report()
+        step1.NETWORK_USAGE.report(step1.BROWSER_PROFILE)
+        if driver:
+            driver.quit()
+
+
+def merge_shards(work_dir, output_dir, output_format="both"):
+    """
+    Assembles the usual pokeking_icu_home_X_<n>_data files from the finished shards,
+    with pages in the order a single serial step1 crawl would have written them.
+    X files that already exist in output_dir are replaced.
+
+    Returns:
+        list: The merged X categories.
+    """
+    unfinished = [filename for name in (PENDING_DIR, CLAIMED_DIR)
+                  for filename in os.listdir(work_subdir(work_dir, name)) if filename.endswith(ITEM_SUFFIX)]
+    if unfinished:
+        print(f"Warning: {len(unfinished)} work items are not finished yet: {sorted(unfinished)}")
+    failed_dir = work_subdir(work_dir, FAILED_DIR)
+    failed = [filename for filename in (os.listdir(failed_dir) if os.path.isdir(failed_dir) else [])
+              if filename.endswith(ITEM_SUFFIX)]
+    if failed:
+        print(f"Warning: {len(failed)} work items failed and are only merged as far as they got: {sorted(failed)}")
+
+    pages = []
+    shards_dir = work_subdir(work_dir, SHARDS_DIR)
+    for filename in sorted(os.listdir(shards_dir)):
+        if not filename.endswith(SHARD_SUFFIX):
+            continue
+        with open(os.path.join(shards_dir, filename), "r", encoding="utf-8") as f:
+            pages.extend(json.loads(line) for line in f if line.strip())
+    pages.sort(key=lambda page: (page["first_page_num"], page["seq"]))
+
+    os.makedirs(output_dir, exist_ok=True)
+    x_vals = {page["x"] for page in pages}
+    for x_val in x_vals:
+        for suffix in step1.OUTPUT_FORMAT_SUFFIXES[output_format]:
+            file_path = os.path.join(output_dir, f"pokeking_icu_home_X_{x_val}_data{suffix}")
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    for page in pages:
+        step1.write_page_data(output_dir, page["x"], page["data"], page["url"], output_format)
+
+    merged_x_categories = sorted(x_vals, key=str)
+    print(f"Merged {len(pages)} pages into '{output_dir}' for X categories: {merged_x_categories}.")
+    return merged_x_categories
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Splits the step1 crawl across processes or hosts through a shared work directory, then merges the shards into the usual X files."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = subparsers.add_parser("plan", help="Write the first pages to scrape as work items.")
+    plan_parser.add_argument("work_dir", help="The shared work directory.")
+    plan_parser.add_argument("--frontier", action="store_true",
+                             help="Log in, collect the target links of all first pages and plan one item per target page instead of one per first page.")
+
+    work_parser = subparsers.add_parser("work", help="Log in, then claim and scrape work items until none are left.")
+    work_parser.add_argument("work_dir", help="The shared work directory.")
+    work_parser.add_argument("--lease_seconds", type=int, default=DEFAULT_LEASE_SECONDS,
+                             help=f"Hand an item out again when its worker shows no progress for this long (default: {DEFAULT_LEASE_SECONDS}).")
+    work_parser.add_argument("--worker_id", default=None,
+                             help="Name of this worker in shard file names (default: hostname-pid).")
+    work_parser.add_argument("--max_attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+                             help=f"Put a failed item back to pending until it has been tried this many times, then move it to '{FAILED_DIR}' (default: {DEFAULT_MAX_ATTEMPTS}).")
+    work_parser.add_argument("--wait_mode", choices=step1.WAIT_MODES, default="dom",
+                             help="'dom' waits on page conditions only (default), 'adaptive' also shortens timeouts to the latencies seen during the run, 'fixed' adds the old fixed sleeps back.")
+    work_parser.add_argument("--wait_poll", type=float, default=step1.DEFAULT_POLL_FREQUENCY,
+                             help=f"Seconds between checks of a wait condition (default: {step1.DEFAULT_POLL_FREQUENCY}).")
+    work_parser.add_argument("--wait_timeout_scale", type=float, default=1.0,
+                             help="Multiplies every wait timeout, e.g. 2 for a slow connection (default: 1.0).")
+    work_parser.add_argument("--expansion", choices=step1.EXPANSION_MODES, default="click",
+                             help="'click' opens cards and nested items one by one (default); 'bulk' opens the whole tree with one script and a single wait.")
+    work_parser.add_argument("--extraction", choices=step1.EXTRACTION_MODES, default="elements",
+                             help="'elements' reads each field with its own browser command (default); 'js' reads the whole page in one script call; 'compare' runs both and reports differences.")
+    work_parser.add_argument("--browser_profile", choices=sorted(step1.BROWSER_PROFILES), default="default",
+                             help="'default' starts Chrome as before; 'lean' blocks images, fonts, media and analytics and turns off extensions and the GPU.")
+    work_parser.add_argument("--block", default=None,
+                             help=f"Comma-separated resource types to block instead of the profile's ({','.join(sorted(step1.RESOURCE_TYPE_PATTERNS))}), or '' for none.")
+    work_parser.add_argument("--block_pattern", action="append", default=[],
+                             help="Also block requests to urls matching this pattern (* wildcards). Can be repeated.")
+    work_parser.add_argument("--report_bandwidth", action="store_true",
+                             help="Record Chrome's performance log to report the MB downloaded and requests made (on anyway with a --browser_profile other than 'default' or anything blocked).")
+    work_parser.add_argument("--recycle_pages", type=int, default=0,
+                             help="Replace the browser with a fresh one (same session) after this many target pages (default: 0, never).")
+    work_parser.add_argument("--recycle_memory_mb", type=float, default=0,
+                             help="Replace the browser once its JS heap reaches this many MB (default: 0, never).")
+
+    merge_parser = subparsers.add_parser("merge", help="Assemble the X files from the finished shards.")
+    merge_parser.add_argument("work_dir", help="The shared work directory.")
+    merge_parser.add_argument("folder_name", help="The output folder for the X files (e.g., 'Pokemon_Data_Run_1').")
+    merge_parser.add_argument("--output_format", choices=sorted(step1.OUTPUT_FORMAT_SUFFIXES), default="both",
+                              help="Write the X files as 'text' (.txt), 'jsonl' (.jsonl) or 'both' (default).")
+
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        first_page_nums = range(1, step1.NUM_FIRST_PAGES + 1)
+        if not args.frontier:
+            plan_work_items(args.work_dir, first_page_nums)
+        else:
+            step1.require_credentials()
+            driver = None
+            try:
+                driver = step1.initialize_driver()
+                if step1.log_in(driver):
+                    plan_frontier_items(args.work_dir, step1.build_url_frontier(driver, first_page_nums))
+                else:
+                    print("Login failed; nothing planned.")
+            finally:
+                if driver:
+                    driver.quit()
+    elif args.command == "work":
+        if args.lease_seconds < 1 or args.max_attempts < 1:
+            parser.error("--lease_seconds and --max_attempts must be at least 1.")
+        if args.wait_poll <= 0 or args.wait_timeout_scale <= 0:
+            parser.error("--wait_poll and --wait_timeout_scale must be positive.")
+        if args.recycle_pages < 0 or args.recycle_memory_mb < 0:
+            parser.error("--recycle_pages and --recycle_memory_mb cannot be negative.")
+        step1.BROWSER_RECYCLING["pages"] = args.recycle_pages
+        step1.BROWSER_RECYCLING["memory_mb"] = args.recycle_memory_mb
+        step1.WAITS.configure(args.wait_mode, args.wait_poll, args.wait_timeout_scale)
+        step1.PAGE_SCRAPE_SETTINGS["expansion"] = args.expansion
+        step1.PAGE_SCRAPE_SETTINGS["extraction"] = args.extraction
+        try:
+            step1.BROWSER_PROFILE.configure(args.browser_profile,
+                                            None if args.block is None else [t for t in args.block.split(",") if t],
+                                            args.block_pattern, args.report_bandwidth)
+        except ValueError as e:
+            parser.error(str(e))
+        step1.require_credentials()
+        run_shard_worker(args.work_dir, args.lease_seconds, args.worker_id, args.max_attempts)
+    elif args.command == "merge":
+        merge_shards(args.work_dir, args.folder_name, args.output_format)
@@ -0,0 +1,219 @@
+# Wait policies for step1: every wait in the scraper goes through a named policy that waits
+# on a DOM condition (element present, aria-expanded flipped, network idle, ...) instead of
+# a fixed time.sleep, and counts the time spent under it.
+
+import time
+import threading
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+# dom:      wait on the condition only, up to the policy timeout
+# adaptive: like dom, but once a policy has seen enough waits its timeout shrinks to a
+#           margin over the latencies observed so far in this run
+# fixed:    like dom, plus the fixed sleep step1 used to do there (the old timings, for comparison)
+WAIT_MODES = ["dom", "adaptive", "fixed"]
+DEFAULT_POLL_FREQUENCY = 0.1
+
+ADAPTIVE_MIN_SAMPLES = 10
+ADAPTIVE_PERCENTILE = 0.95
+ADAPTIVE_MARGIN = 3.0
+ADAPTIVE_MIN_TIMEOUT = 1.0
+
+# How long the network has to stay quiet before the page counts as settled
+DEFAULT_NETWORK_IDLE_SECONDS = 0.5
+
+# Counts XHR/fetch requests in flight in window.__scrapekingPendingRequests. Installed in
+# every new document before the page's own scripts run (install_network_hook), so requests
+# a page starts while it loads are counted too
+NETWORK_HOOK_SCRIPT = """
+if (window.__scrapekingPendingRequests === undefined) {
+    window.__scrapekingPendingRequests = 0;
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        window.__scrapekingPendingRequests++;
+        this.addEventListener('loadend', function () { window.__scrapekingPendingRequests--; });
+        return originalSend.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function () {
+            window.__scrapekingPendingRequests++;
+            return originalFetch.apply(this, arguments).finally(function () { window.__scrapekingPendingRequests--; });
+        };
+    }
+}
+"""
+
+# The requests in flight alongside the document state and the number of finished resource
+# loads. Hooks the page itself if install_network_hook could not (then only the requests
+# started after the first poll are counted)
+NETWORK_STATE_SCRIPT = NETWORK_HOOK_SCRIPT + """
+return [document.readyState, performance.getEntriesByType('resource').length, window.__scrapekingPendingRequests];
+"""
+
+
+def install_network_hook(driver):
+    """Has the browser run NETWORK_HOOK_SCRIPT in every page it loads from now on, before the page's scripts."""
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": NETWORK_HOOK_SCRIPT})
+    except Exception as e:
+        print(f"Could not install the network hook ({e}); requests are counted from the first network wait of each page.")
+
+
+class NetworkIdle:
+    """
+    Expected condition: the document has loaded, no XHR/fetch request is in flight and
+    no resource has finished loading for idle_seconds. Use a new instance for every wait.
+    """
+
+    def __init__(self, idle_seconds=DEFAULT_NETWORK_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self.last_state = None
+        self.changed_at = None
+
+    def __call__(self, driver):
+        state = driver.execute_script(NETWORK_STATE_SCRIPT)
+        now = time.monotonic()
+        if state != self.last_state:
+            self.last_state = state
+            self.changed_at = now
+            return False
+        ready_state, _, pending_requests = state
+        return ready_state == "complete" and pending_requests == 0 and now - self.changed_at >= self.idle_seconds
+
+
+# Starts recording when anything inside an element last changed (children, attributes or
+# text); the time is reset, so call it right before the action whose result is awaited
+WATCH_MUTATIONS_SCRIPT = """
+var element = arguments[0];
+element.__scrapekingLastMutation = performance.now();
+if (!element.__scrapekingObserver) {
+    element.__scrapekingObserver = new MutationObserver(function () {
+        element.__scrapekingLastMutation = performance.now();
+    });
+    element.__scrapekingObserver.observe(element, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+"""
+# Milliseconds since the last change WATCH_MUTATIONS_SCRIPT recorded
+MUTATION_QUIET_MS_SCRIPT = "return performance.now() - arguments[0].__scrapekingLastMutation;"
+
+
+class SubtreeSettled:
+    """
+    Expected condition: nothing inside element has changed for idle_seconds since the
+    condition was created (create it right before the click) and the network is idle.
+    Content rendered after a request or a delay resets the quiet time, so the wait lasts
+    until it has arrived; an item that renders nothing settles after idle_seconds.
+    """
+
+    def __init__(self, driver, element, idle_seconds=DEFAULT_NETWORK_IDLE_SECONDS):
+        self.driver = driver
+        self.element = element
+        self.idle_seconds = idle_seconds
+        self.network_idle = NetworkIdle(idle_seconds)
+        driver.execute_script(WATCH_MUTATIONS_SCRIPT, element)
+
+    def __call__(self, target):
+        quiet_ms = self.driver.execute_script(MUTATION_QUIET_MS_SCRIPT, self.element)
+        return self.network_idle(self.driver) and quiet_ms >= self.idle_seconds * 1000
+
+
+def all_of(*conditions):
+    """Expected condition that holds when every condition holds; returns the last result."""
+    def condition(driver):
+        result = True
+        for sub_condition in conditions:
+            result = sub_condition(driver)
+            if not result:
+                return False
+        return result
+    return condition
+
+
+class WaitPolicy:
+    """Timeout settings and wait counters of one kind of wait."""
+
+    def __init__(self, name, timeout, fixed_sleep=0):
+        self.name = name
+        self.timeout = timeout
+        self.fixed_sleep = fixed_sleep
+        self.calls = 0
+        self.timeouts = 0
+        self.total_seconds = 0.0
+        self.latencies = []
+
+    def adaptive_timeout(self, timeout):
+        """The timeout shrunk to fit the latencies seen so far, never above the configured one."""
+        if len(self.latencies) < ADAPTIVE_MIN_SAMPLES:
+            return timeout
+        latencies = sorted(self.latencies)
+        typical_latency = latencies[min(len(latencies) - 1, int(len(latencies) * ADAPTIVE_PERCENTILE))]
+        return min(timeout, max(ADAPTIVE_MIN_TIMEOUT, typical_latency * ADAPTIVE_MARGIN))
+
+
+class WaitPolicyEngine:
+    """
+    Runs every wait of the scraper under a named policy, with shared polling and
+    timeout settings, and reports the time spent waiting per policy.
+    New policies can be added with register().
+    """
+
+    def __init__(self, mode="dom", poll_frequency=DEFAULT_POLL_FREQUENCY, timeout_scale=1.0):
+        self.policies = {}
+        self.lock = threading.Lock()  # Several browsers may wait at once
+        self.configure(mode, poll_frequency, timeout_scale)
+
+    def configure(self, mode="dom", poll_frequency=DEFAULT_POLL_FREQUENCY, timeout_scale=1.0):
+        if mode not in WAIT_MODES:
+            raise ValueError(f"Unknown wait mode '{mode}', expected one of {WAIT_MODES}.")
+        self.mode = mode
+        self.poll_frequency = poll_frequency
+        self.timeout_scale = timeout_scale
+
+    def register(self, name, timeout, fixed_sleep=0):
+        self.policies[name] = WaitPolicy(name, timeout, fixed_sleep)
+
+    def wait(self, name, target, condition, timeout=None):
+        """
+        Waits until condition(target) is truthy under the named policy and returns its result.
+        timeout overrides the policy's timeout for this wait. Raises TimeoutException like WebDriverWait.
+        """
+        policy = self.policies[name]
+        timeout = (policy.timeout if timeout is None else timeout) * self.timeout_scale
+        if self.mode == "adaptive":
+            with self.lock:
+                timeout = policy.adaptive_timeout(timeout)
+
+        start_time = time.monotonic()
+        latency = None
+        timed_out = False
+        try:
+            result = WebDriverWait(target, timeout, poll_frequency=self.poll_frequency).until(condition)
+            latency = time.monotonic() - start_time
+            if self.mode == "fixed" and policy.fixed_sleep:
+                time.sleep(policy.fixed_sleep)
+            return result
+        except TimeoutException:
+            timed_out = True
+            raise
+        finally:
+            elapsed = time.monotonic() - start_time
+            with self.lock:
+                policy.calls += 1
+                policy.total_seconds += elapsed
+                if timed_out:
+                    policy.timeouts += 1
+                elif latency is not None:
+                    policy.latencies.append(latency)
+
+    def report(self):
+        """Prints the number of waits, timeouts and seconds spent waiting under each policy."""
+        print(f"\n--- Time spent waiting (wait mode: {self.mode}) ---")
+        total_seconds = 0.0
+        for policy in sorted(self.policies.values(), key=lambda p: p.total_seconds, reverse=True):
+            if not policy.calls:
+                continue
+            total_seconds += policy.total_seconds
+            print(f"   {policy.name:<20} {policy.calls:>6} waits  {policy.timeouts:>5} timeouts  "
+                  f"{policy.total_seconds:>9.1f} s  (avg {policy.total_seconds / policy.calls:.2f} s)")
+        print(f"   {'total':<20} {total_seconds:>40.1f} s")
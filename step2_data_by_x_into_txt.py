@@ -4,119 +4,481 @@ import traceback
 import argparse
 import string
 import unicodedata
+import sys
+import contextlib
+import mmap
+import multiprocessing
+import hashlib
+import gzip
+import json
 
-def clean_text(text):
+# Specific examples you provided. Multi-codepoint entries such as '👇🏻' can never
+# equal a single character, so only their single-character forms ever match.
+LISTED_SYMBOLS = ['【', '】', '，', '（', '）', '？', '+', '%', '.', '/', '👇🏻', '👇', '①', '②', '👆🏻', '🐭', '💡', '。', '⚠️', '🐸', '!', '：', '↓', '④', '③']
+
+# Emojis (common unicode ranges for emojis)
+# This is a heuristic and might not catch all emojis, but covers many.
+EMOJI_RANGES = [
+    (0x1F600, 0x1F64F),
+    (0x1F300, 0x1F5FF),
+    (0x1F680, 0x1F6FF),
+    (0x1F1E0, 0x1F1FF),
+    (0x2600, 0x26FF),
+    (0x2700, 0x27BF),
+]
+
+# Character categories clean_text can drop, each a test on a single character
+DROP_CATEGORY_TESTS = {
+    # English letters
+    "english_letters": lambda char: 'a' <= char <= 'z' or 'A' <= char <= 'Z',
+    "punctuation": lambda char: char in string.punctuation,
+    # isdigit plus every 'N' (Number) category, which covers various number forms
+    "numbers": lambda char: char.isdigit() or unicodedata.category(char).startswith('N'),
+    # This covers a broad range of unicode math symbols
+    "math_symbols": lambda char: unicodedata.category(char).startswith('Sm'),
+    "emojis": lambda char: any(start <= ord(char) <= end for start, end in EMOJI_RANGES),
+    "listed_symbols": lambda char: char in LISTED_SYMBOLS,
+}
+DEFAULT_DROP_CATEGORIES = tuple(DROP_CATEGORY_TESTS)
+
+
+class CleanTable(dict):
+    """
+    str.translate table mapping every dropped codepoint to a space.
+    The keep/drop decision for a codepoint is computed the first time it is looked up
+    and stored in the table, so each distinct character is classified only once per
+    run and every later value is cleaned in a single C-level translate pass. (Building
+    the table eagerly over all 1.1M codepoints costs about as much as a whole step2 run.)
+    """
+
+    def __init__(self, drop_categories=DEFAULT_DROP_CATEGORIES):
+        super().__init__()
+        unknown = [category for category in drop_categories if category not in DROP_CATEGORY_TESTS]
+        if unknown:
+            raise ValueError(f"Unknown drop categories: {', '.join(unknown)}. "
+                             f"Choose from: {', '.join(DROP_CATEGORY_TESTS)}.")
+        self.drop_categories = tuple(drop_categories)
+        self.drop_tests = [DROP_CATEGORY_TESTS[category] for category in drop_categories]
+
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        replacement = ' ' if any(test(char) for test in self.drop_tests) else char
+        self[codepoint] = replacement
+        return replacement
+
+
+DEFAULT_CLEAN_TABLE = CleanTable()
+
+
+def clean_text(text, clean_table=DEFAULT_CLEAN_TABLE):
     """
-    Removes English letters, punctuation, numbers, math symbols, and emojis.
+    Removes English letters, punctuation, numbers, math symbols, and emojis
+    (or whichever categories clean_table was built with).
     Replaces removed characters with a space.
     """
-    cleaned_chars = []
-    for char in text:
-        # Remove English letters
-        if 'a' <= char <= 'z' or 'A' <= char <= 'Z':
-            cleaned_chars.append(' ')
-            continue
+    # Translate, then split by whitespace to handle multiple spaces from removals
+    # Then join with a single space to normalize
+    return ' '.join(text.translate(clean_table).split())
 
-        # Remove punctuation
-        if char in string.punctuation:
-            cleaned_chars.append(' ')
-            continue
 
-        # Remove numbers
-        if char.isdigit():
-            cleaned_chars.append(' ')
-            continue
+# Labels of the data points we want to extract, keyed by field name, as step1 writes them
+# at the start of a line (after indentation): "<label>: <value>"
+FIELD_LABELS = {
+    "alert_text": "Alert Text",
+    "pokemon_name": "pokemon_name",
+    "red_bold_text": "red_bold_text",
+    "warning_badge_text": "warning_badge_text",
+    "nested_header_label_text": "nested_header_label_text (collapsed)",
+    "nested_header_operate_text": "nested_header_operate_text (collapsed)",
+    "nested_trick_text": "nested_trick_text (expanded)",
+    "nested_body_label_text": "nested_body_label_text (expanded)",
+    "nested_body_operate_text": "nested_body_operate_text (expanded)",
+    "nested_warning_badge_text": "nested_warning_badge_text (expanded)"
+}
+FIELD_NAMES_BY_LABEL = {label.encode('utf-8'): field for field, label in FIELD_LABELS.items()}
 
-        # Remove math symbols
-        # This covers a broad range of unicode math symbols
-        if unicodedata.category(char).startswith('Sm') or \
-           unicodedata.category(char).startswith('N'): # 'N' for Number, covers various number forms
-            cleaned_chars.append(' ')
-            continue
+# Leading whitespace of a line, as str.strip() would remove it, spelled out in UTF-8:
+# every Unicode whitespace character except the newline that ends the line.
+LINE_INDENT_PATTERN = (
+    rb'(?:[\t\x0b\x0c\r\x1c-\x20]|\xc2[\x85\xa0]|\xe1\x9a\x80'
+    rb'|\xe2\x80[\x80-\x8a\xa8\xa9\xaf]|\xe2\x81\x9f|\xe3\x80\x80)*'
+)
 
-        # Remove emojis (common unicode ranges and categories for emojis)
-        # This is a heuristic and might not catch all emojis, but covers many.
-        if 0x1F600 <= ord(char) <= 0x1F64F or \
-           0x1F300 <= ord(char) <= 0x1F5FF or \
-           0x1F680 <= ord(char) <= 0x1F6FF or \
-           0x1F1E0 <= ord(char) <= 0x1F1FF or \
-           0x2600 <= ord(char) <= 0x26FF or \
-           0x2700 <= ord(char) <= 0x27BF:
-            cleaned_chars.append(' ')
-            continue
-        
-        # Specific examples you provided
-        if char in ['【', '】', '，', '（', '）', '？', '+', '%', '.', '/', '👇🏻', '👇', '①', '②', '👆🏻', '🐭', '💡', '。', '⚠️', '🐸', '!', '：', '↓', '④', '③']:
-            cleaned_chars.append(' ')
+# One combined pattern for all field lines. It runs over a whole memory-mapped file in a
+# single scan, so structural lines ("==========", "---", "Nested Item ...") are skipped by
+# the regex engine without ever being turned into Python strings.
+FIELD_LINE_PATTERN = re.compile(
+    rb'^' + LINE_INDENT_PATTERN
+    + rb'(' + rb'|'.join(re.escape(label) for label in FIELD_NAMES_BY_LABEL) + rb'): (.*)$',
+    re.MULTILINE
+)
+
+
+def iter_file_field_values(filepath):
+    """
+    Memory-maps one scraped data file and yields (field name, value) for every
+    target field line in it, with the value decoded and stripped.
+    JSONL record files from step1 are read natively instead, without any regex.
+    """
+    if filepath.endswith(JSONL_SUFFIX):
+        for page_x, page_y, field_name, value in iter_jsonl_field_records(filepath):
+            yield field_name, value
+        return
+
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return # Nothing to map in an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for match in FIELD_LINE_PATTERN.finditer(data):
+                yield FIELD_NAMES_BY_LABEL[match.group(1)], match.group(2).decode('utf-8').strip()
+
+
+# Field lines plus the "========== Data from page x/y ==========" headers step1 writes
+# before each item, for extraction that needs to know which page a value came from
+RECORD_LINE_PATTERN = re.compile(
+    rb'^' + LINE_INDENT_PATTERN
+    + rb'(?:=+ Data from page ([^/\n]*)/([^ \n]*) =+\r?'
+    + rb'|(' + rb'|'.join(re.escape(label) for label in FIELD_NAMES_BY_LABEL) + rb'): (.*))$',
+    re.MULTILINE
+)
+
+
+def iter_file_field_records(filepath):
+    """
+    Like iter_file_field_values, but yields (page_x, page_y, field name, value) with the
+    page taken from the closest preceding "Data from page x/y" header ("N/A" before any).
+    """
+    if filepath.endswith(JSONL_SUFFIX):
+        yield from iter_jsonl_field_records(filepath)
+        return
+
+    page_x = page_y = "N/A"
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return # Nothing to map in an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for match in RECORD_LINE_PATTERN.finditer(data):
+                label = match.group(3)
+                if label is None:
+                    page_x = match.group(1).decode('utf-8')
+                    page_y = match.group(2).decode('utf-8')
+                else:
+                    yield page_x, page_y, FIELD_NAMES_BY_LABEL[label], match.group(4).decode('utf-8').strip()
+
+
+# step1 can also write each page item as one JSON record per line to
+# pokeking_icu_home_X_<n>_data.jsonl, keeping the full nested tree
+JSONL_SUFFIX = ".jsonl"
+
+# Fields read from a card record itself and from each of its nested items
+CARD_FIELDS = ["pokemon_name", "red_bold_text", "warning_badge_text"]
+NESTED_FIELDS = [
+    "nested_header_label_text",
+    "nested_header_operate_text",
+    "nested_trick_text",
+    "nested_body_label_text",
+    "nested_body_operate_text",
+    "nested_warning_badge_text",
+]
+
+
+def iter_nested_field_values(nested_items):
+    """Yields (field name, value) for a nested item tree, depth first, in step1's text order."""
+    for nested_entry in nested_items:
+        for field_name in NESTED_FIELDS:
+            yield field_name, nested_entry.get(field_name, "N/A")
+        yield from iter_nested_field_values(nested_entry.get("sub_nested_items", []))
+
+
+def iter_record_field_values(record):
+    """Yields (field name, value) for every target field of one step1 record."""
+    if record.get("type") == "alert_box_data":
+        # Multi-line alert texts stay whole here; the text format only kept their first line
+        for text in record.get("alert_box_texts", []):
+            yield "alert_text", text
+    elif record.get("type") == "card_data":
+        for field_name in CARD_FIELDS:
+            yield field_name, record.get(field_name, "N/A")
+        yield from iter_nested_field_values(record.get("nested_items", []))
+
+
+def iter_jsonl_field_records(filepath):
+    """
+    Reads a step1 JSONL record file and yields (page_x, page_y, field name, value)
+    straight from the records, with the value stripped.
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            page_x = str(record.get("page_x", "N/A"))
+            page_y = str(record.get("page_y", "N/A"))
+            for field_name, value in iter_record_field_values(record):
+                yield page_x, page_y, field_name, str(value).strip()
+
+
+# Output filename meaning "standard output", for chaining step2 into step3 in a shell pipeline
+STREAM_PATH = "-"
+
+
+def list_data_files(input_dir):
+    """
+    Returns the names of the pokeking_icu_home_X_* data files in the input directory.
+    When step1 wrote both formats for an X, only the .jsonl record file is returned.
+    """
+    filenames = [filename for filename in os.listdir(input_dir)
+                 if filename.startswith("pokeking_icu_home_X_") and filename.endswith((".txt", JSONL_SUFFIX))]
+    jsonl_stems = {os.path.splitext(filename)[0] for filename in filenames if filename.endswith(JSONL_SUFFIX)}
+    return [filename for filename in filenames
+            if filename.endswith(JSONL_SUFFIX) or os.path.splitext(filename)[0] not in jsonl_stems]
+
+
+def iter_value_tokens(value, clean_table=DEFAULT_CLEAN_TABLE):
+    """Yields the cleaned, space-separated tokens of one extracted field value."""
+    # Only add values that are not "N/A"
+    if value and value.upper() != 'N/A':
+        cleaned_value = clean_text(value, clean_table)
+        # Split the cleaned value by spaces and yield each part
+        # This handles the "make a column for every space separated value" requirement
+        if cleaned_value: # Only add if something remains after cleaning
+            for item in cleaned_value.split():
+                if item: # Ensure no empty strings are added
+                    yield item
+
+
+def extract_file_tokens(filepath, clean_table, file_tokens):
+    """
+    Adds every cleaned, space-separated value of the target fields in one data file
+    to the file_tokens set. Tokens found before an error stay in the set.
+    """
+    for field_name, value in iter_file_field_values(filepath):
+        file_tokens.update(iter_value_tokens(value, clean_table))
+
+
+# Per-process clean table for --workers mode, built once by the pool initializer
+_worker_clean_table = {}
+
+
+def _init_extract_worker(drop_categories):
+    """Pool initializer: builds the clean table once per worker process."""
+    _worker_clean_table["table"] = CleanTable(drop_categories)
+
+
+def _extract_file_group(filepaths):
+    """
+    Pool task: extracts the token set of each file in the group. Errors are returned
+    instead of printed, so the parent logs them in the same place as in a serial run.
+    """
+    results = []
+    for filepath in filepaths:
+        file_tokens = set()
+        error = None
+        try:
+            extract_file_tokens(filepath, _worker_clean_table["table"], file_tokens)
+        except Exception as e:
+            error = (str(e), traceback.format_exc())
+        results.append((os.path.basename(filepath), file_tokens, error))
+    return results
+
+
+def iter_file_token_sets(input_dir, clean_table=DEFAULT_CLEAN_TABLE, workers=1, files_per_task=1,
+                         filenames=None):
+    """
+    Yields (filename, token set, succeeded) for each pokeking_icu_home_X_* data file in
+    the input directory (or just the given filenames), logging each file and any error
+    the same way in both modes. With workers > 1, files are sent in groups of
+    files_per_task to a process pool.
+    """
+    if filenames is None:
+        filenames = list_data_files(input_dir)
+
+    if workers <= 1:
+        # Iterate through all files in the specified directory
+        for filename in filenames:
+            print(f"    Processing file: {filename}")
+            file_tokens = set()
+            succeeded = True
+            try:
+                extract_file_tokens(os.path.join(input_dir, filename), clean_table, file_tokens)
+            except Exception as e:
+                print(f"    Error processing file {filename}: {e}")
+                traceback.print_exc()
+                succeeded = False
+            yield filename, file_tokens, succeeded
+        return
+
+    filepaths = [os.path.join(input_dir, filename) for filename in filenames]
+    file_groups = [filepaths[i:i + files_per_task] for i in range(0, len(filepaths), files_per_task)]
+    print(f"    Processing {len(filepaths)} files with {workers} worker processes...")
+    with multiprocessing.Pool(workers, initializer=_init_extract_worker,
+                              initargs=(clean_table.drop_categories,)) as pool:
+        for group_results in pool.imap_unordered(_extract_file_group, file_groups):
+            for filename, file_tokens, error in group_results:
+                print(f"    Processing file: {filename}")
+                if error:
+                    error_message, error_traceback = error
+                    print(f"    Error processing file {filename}: {error_message}")
+                    sys.stderr.write(error_traceback)
+                yield filename, file_tokens, error is None
+
+
+def iter_extracted_tokens(input_dir, clean_table=DEFAULT_CLEAN_TABLE, workers=1, files_per_task=1):
+    """
+    Reads through all pokeking_icu_home_X_* data files in the input directory, one scan
+    per file, and yields every cleaned, space-separated value of the target fields.
+    Only one file's tokens are held at a time, so a token may be yielded more than once;
+    callers dedupe (extract_and_format_data with a set, the streaming modes as they go).
+    """
+    for filename, file_tokens, succeeded in iter_file_token_sets(input_dir, clean_table, workers, files_per_task):
+        yield from file_tokens
+
+
+# Per-file extraction manifest kept in the run directory. For every X file it records
+# size, mtime and content hash together with the file's token set, so a rerun only
+# re-extracts new or changed files.
+MANIFEST_FILENAME = "step2_extraction_manifest.json.gz"
+# Bump when the extraction itself changes, so old manifests are not reused
+MANIFEST_VERSION = 1
+
+
+def file_content_hash(filepath):
+    """Returns the sha256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_extraction_manifest(input_dir, clean_table):
+    """
+    Returns {filename: entry} from the run directory's manifest, or {} when there is
+    none or it was written by another manifest version or with other drop categories.
+    """
+    manifest_path = os.path.join(input_dir, MANIFEST_FILENAME)
+    try:
+        with gzip.open(manifest_path, 'rt', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, EOFError, json.JSONDecodeError) as e:
+        print(f"    Warning: Ignoring unreadable manifest '{manifest_path}': {e}")
+        return {}
+
+    if (manifest.get("version") != MANIFEST_VERSION
+            or manifest.get("drop_categories") != list(clean_table.drop_categories)):
+        print("    Manifest was written with different extraction settings; re-extracting every file.")
+        return {}
+    return manifest.get("files", {})
+
+
+def save_extraction_manifest(input_dir, clean_table, file_entries):
+    """Writes the manifest atomically (temp file + rename) into the run directory."""
+    manifest_path = os.path.join(input_dir, MANIFEST_FILENAME)
+    temp_path = manifest_path + ".tmp"
+    try:
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "drop_categories": list(clean_table.drop_categories),
+                "files": file_entries,
+            }, f, ensure_ascii=False)
+        os.replace(temp_path, manifest_path)
+        print(f"    Saved extraction manifest to: {manifest_path}")
+    except OSError as e:
+        print(f"    Error writing manifest '{manifest_path}': {e}")
+        traceback.print_exc()
+
+
+def split_files_by_manifest(input_dir, filenames, manifest_entries):
+    """
+    Compares each data file against its manifest entry. Files whose size and mtime are
+    unchanged, or whose content hash still matches, keep their entry; all others are
+    returned as changed.
+
+    Returns:
+        tuple: (unchanged entries by filename, list of changed filenames)
+    """
+    unchanged_entries = {}
+    changed_filenames = []
+    for filename in filenames:
+        entry = manifest_entries.get(filename)
+        if entry is None:
+            changed_filenames.append(filename)
             continue
 
-        cleaned_chars.append(char)
+        file_stat = os.stat(os.path.join(input_dir, filename))
+        if file_stat.st_size == entry["size"] and file_stat.st_mtime_ns == entry["mtime_ns"]:
+            unchanged_entries[filename] = entry
+        elif (file_stat.st_size == entry["size"]
+              and file_content_hash(os.path.join(input_dir, filename)) == entry["sha256"]):
+            # Touched but not modified: keep the tokens, remember the new mtime
+            unchanged_entries[filename] = dict(entry, mtime_ns=file_stat.st_mtime_ns)
+        else:
+            changed_filenames.append(filename)
+    return unchanged_entries, changed_filenames
 
-    # Join and then split by spaces to handle multiple spaces from removals
-    # Then join with a single space to normalize
-    return ' '.join("".join(cleaned_chars).split())
+
+def iter_unique_tokens(tokens):
+    """Yields each token the first time it is seen; only the dedupe set is held."""
+    seen_tokens = set()
+    for token in tokens:
+        if token not in seen_tokens:
+            seen_tokens.add(token)
+            yield token
 
 
-def extract_and_format_data(input_dir, output_file_path):
+def extract_and_format_data(input_dir, output_file_path, clean_table=DEFAULT_CLEAN_TABLE,
+                            workers=1, files_per_task=1, full=False):
     """
-    Reads through all .txt files in the specified input directory,
+    Reads through all data files (.txt, or step1's .jsonl records) in the specified input directory,
     extracts specific data values, filters out 'N/A' entries,
     removes English, punctuation, numbers, math symbols, and emojis,
     and stores them in a set to automatically handle duplicates.
     Finally, it writes the unique, space-separated values to a single output file.
+    With workers > 1, the files are processed in a pool of worker processes and
+    their token sets are merged before the final sort.
+    Unless full is set, only files that are new or changed since the last run (per the
+    manifest in the input directory) are re-read; the others reuse their recorded tokens.
     """
-    # Use a set to store extracted values to automatically handle duplicates
-    all_extracted_values = set()
-
-    # Define the regex patterns for the data points we want to extract
-    patterns = {
-        "alert_text": re.compile(r'^\s*Alert Text: (.*)$'),
-        "pokemon_name": re.compile(r'^\s*pokemon_name: (.*)$'),
-        "red_bold_text": re.compile(r'^\s*red_bold_text: (.*)$'),
-        "warning_badge_text": re.compile(r'^\s*warning_badge_text: (.*)$'),
-        "nested_header_label_text": re.compile(r'^\s*nested_header_label_text \(collapsed\): (.*)$'),
-        "nested_header_operate_text": re.compile(r'^\s*nested_header_operate_text \(collapsed\): (.*)$'),
-        "nested_trick_text": re.compile(r'^\s*nested_trick_text \(expanded\): (.*)$'),
-        "nested_body_label_text": re.compile(r'^\s*nested_body_label_text \(expanded\): (.*)$'),
-        "nested_body_operate_text": re.compile(r'^\s*nested_body_operate_text \(expanded\): (.*)$'),
-        "nested_warning_badge_text": re.compile(r'^\s*nested_warning_badge_text \(expanded\): (.*)$')
-    }
-
     print(f"Starting data extraction from files in: {input_dir}")
 
     if not os.path.exists(input_dir):
         print(f"Error: Input directory '{input_dir}' not found.")
         return
 
-    # Iterate through all files in the specified directory
-    for filename in os.listdir(input_dir):
-        if filename.startswith("pokeking_icu_home_X_") and filename.endswith(".txt"):
+    filenames = list_data_files(input_dir)
+    manifest_entries = {} if full else load_extraction_manifest(input_dir, clean_table)
+    file_entries, changed_filenames = split_files_by_manifest(input_dir, filenames, manifest_entries)
+    print(f"    {len(file_entries)} files unchanged since the last run, {len(changed_filenames)} to process.")
+
+    # Use a set to store extracted values to automatically handle duplicates
+    all_extracted_values = set()
+    for entry in file_entries.values():
+        all_extracted_values.update(entry["tokens"].split("\n") if entry["tokens"] else [])
+
+    for filename, file_tokens, succeeded in iter_file_token_sets(input_dir, clean_table, workers,
+                                                                 files_per_task, changed_filenames):
+        all_extracted_values.update(file_tokens)
+        if succeeded:
             filepath = os.path.join(input_dir, filename)
-            print(f"    Processing file: {filename}")
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-
-                        for key, pattern in patterns.items():
-                            match = pattern.match(line)
-                            if match:
-                                value = match.group(1).strip()
-                                # Only add values that are not "N/A"
-                                if value and value.upper() != 'N/A':
-                                    cleaned_value = clean_text(value)
-                                    # Split the cleaned value by spaces and add each part to the set
-                                    # This handles the "make a column for every space separated value" requirement
-                                    if cleaned_value: # Only add if something remains after cleaning
-                                        for item in cleaned_value.split():
-                                            if item: # Ensure no empty strings are added
-                                                all_extracted_values.add(item)
-                                break
+            file_stat = os.stat(filepath)
+            file_entries[filename] = {
+                "size": file_stat.st_size,
+                "mtime_ns": file_stat.st_mtime_ns,
+                "sha256": file_content_hash(filepath),
+                "tokens": "\n".join(sorted(file_tokens)),
+            }
+
+    if file_entries != manifest_entries:
+        save_extraction_manifest(input_dir, clean_table, file_entries)
+
+    write_extracted_values(all_extracted_values, output_file_path)
 
-            except Exception as e:
-                print(f"    Error processing file {filename}: {e}")
-                traceback.print_exc()
 
+def write_extracted_values(all_extracted_values, output_file_path):
+    """Writes the unique values, sorted, one per line to the output file."""
     # Join all collected unique values with a newline to put each on its own "column" (line)
     final_output_string = "\n".join(sorted(list(all_extracted_values)))
 
@@ -140,6 +502,26 @@ def extract_and_format_data(input_dir, output_file_path):
         print(f"Error writing to output file '{output_file_path}': {e}")
         traceback.print_exc()
 
+
+def stream_extracted_values(input_dir, stream_output, clean_table=DEFAULT_CLEAN_TABLE,
+                            workers=1, files_per_task=1):
+    """
+    Writes each unique cleaned value to stream_output as soon as it is found
+    (first-seen order, one per line), without building or sorting the full list.
+    """
+    print(f"Starting streaming data extraction from files in: {input_dir}")
+
+    if not os.path.exists(input_dir):
+        print(f"Error: Input directory '{input_dir}' not found.")
+        return
+
+    streamed_count = 0
+    for token in iter_unique_tokens(iter_extracted_tokens(input_dir, clean_table, workers, files_per_task)):
+        stream_output.write(token + "\n")
+        stream_output.flush()
+        streamed_count += 1
+    print(f"\nStreamed {streamed_count} unique values.")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Extracts specific text values from Pokeking scraped data files and saves unique, cleaned values to an output file."
@@ -156,13 +538,58 @@ if __name__ == "__main__":
         "-o", "--output_filename",
         type=str,
         default="extracted_pokeking_values.txt", # Default name for the output file
-        help="The name of the file where unique extracted values will be saved (e.g., 'my_unique_data.txt'). This file will be saved in the input directory."
+        help="The name of the file where unique extracted values will be saved (e.g., 'my_unique_data.txt'). This file will be saved in the input directory. Use '-' to stream the values to stdout as they are found (e.g. to pipe into step3)."
+    )
+
+    parser.add_argument(
+        "--drop_categories",
+        type=str,
+        default=",".join(DEFAULT_DROP_CATEGORIES),
+        help=f"Comma-separated character categories to remove from values (default: all of {', '.join(DROP_CATEGORY_TESTS)})."
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes to extract files with (default: 1, no process pool)."
+    )
+
+    parser.add_argument(
+        "--files_per_task",
+        type=int,
+        default=1,
+        help="How many X files a worker process handles per task in --workers mode (default: 1)."
+    )
+
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help=f"Re-extract every X file instead of reusing unchanged ones recorded in {MANIFEST_FILENAME}."
     )
 
     args = parser.parse_args()
 
+    if args.workers < 1 or args.files_per_task < 1:
+        parser.error("--workers and --files_per_task must be at least 1.")
+
+    try:
+        clean_table = CleanTable([category.strip() for category in args.drop_categories.split(",") if category.strip()])
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.output_filename == STREAM_PATH:
+        # stdout carries only the values so it can be piped; status messages go to stderr
+        data_stdout = sys.stdout
+        data_stdout.reconfigure(encoding='utf-8')
+        with contextlib.redirect_stdout(sys.stderr):
+            stream_extracted_values(args.input_dir, data_stdout, clean_table,
+                                    args.workers, args.files_per_task)
+        sys.exit()
+
     # Construct the full output file path to be inside the input directory
     full_output_file_path = os.path.join(args.input_dir, args.output_filename)
 
     # Call your function with the input directory and the newly constructed full output path
-    extract_and_format_data(args.input_dir, full_output_file_path)
\ No newline at end of file
+    extract_and_format_data(args.input_dir, full_output_file_path, clean_table,
+                            args.workers, args.files_per_task, args.full)
\ No newline at end of file
@@ -0,0 +1,150 @@
+# cmd prompt ex:
+# python step2_to_step3_pipeline.py -i 8E8EBC6ECBC9DEE4FE9BFAEC97A05375_code
+# python step2_to_step3_pipeline.py -i 8E8EBC6ECBC9DEE4FE9BFAEC97A05375_code -o untranslated_lines.txt --values_output extracted_pokeking_values.txt
+
+import os
+import sys
+import argparse
+import contextlib
+import traceback
+
+from step2_data_by_x_into_txt import iter_extracted_tokens, write_extracted_values
+
+# step3 lives in its own folder next to its dictionary; make it importable from here
+STEP3_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "step3_find_untranslated_values")
+sys.path.insert(0, STEP3_DIR)
+
+from step3_filter_untranslated_values import (
+    CACHE_SUFFIX,
+    DEFAULT_CACHE_MAX_ENTRIES,
+    DEFAULT_CHUNK_SIZE,
+    MATCH_MODES,
+    STREAM_PATH,
+    iter_untranslated_parts,
+    load_segmentation_cache,
+    load_sorted_terms,
+    print_cache_stats,
+    save_segmentation_cache,
+    sort_untranslated_parts,
+)
+
+
+def collect_values(tokens, extracted_values):
+    """Passes the tokens through unchanged while recording them for the values sink."""
+    for token in tokens:
+        extracted_values.add(token)
+        yield token
+
+
+def run_pipeline(input_dir, dictionary_path, output_path=STREAM_PATH, values_output_path=None,
+                 match_mode="trie", use_index=True, workers=1, chunk_size=DEFAULT_CHUNK_SIZE,
+                 cache_path=None, cache_max_entries=DEFAULT_CACHE_MAX_ENTRIES, stream_output=None,
+                 extract_workers=1):
+    """
+    Feeds the cleaned tokens of a scrape run directory (step2) straight into the
+    dictionary matcher (step3) through generators, without writing or re-reading
+    extracted_pokeking_values.txt in between.
+
+    Args:
+        input_dir (str): The run directory with the pokeking_icu_home_X_* data files (.txt or .jsonl).
+        dictionary_path (str): The path to your dictionary.json file.
+        output_path (str): "-" streams each untranslated part as soon as it is found;
+                           a file path writes them sorted by length, like step3 does.
+        values_output_path (str): Optional path to also write the unique extracted values
+                                  to, sorted, like step2 does.
+        stream_output: Text stream used when output_path is "-" (default: sys.stdout).
+        extract_workers (int): Number of processes step2 extracts the X files with.
+        The remaining arguments are the step3 matcher, worker and cache options.
+    """
+    if not os.path.exists(input_dir):
+        print(f"Error: Input directory '{input_dir}' not found.")
+        return
+
+    existing_chinese_terms = load_sorted_terms(dictionary_path, use_index)
+    if existing_chinese_terms is None:
+        return
+
+    cache = load_segmentation_cache(cache_path, existing_chinese_terms) if cache_path else None
+
+    print(f"Streaming values from '{input_dir}' into the dictionary matcher...")
+    tokens = iter_extracted_tokens(input_dir, workers=extract_workers)
+    extracted_values = None
+    if values_output_path:
+        # The values sink has to see every unique value before it can sort them
+        extracted_values = set()
+        tokens = collect_values(tokens, extracted_values)
+
+    untranslated_parts = iter_untranslated_parts(tokens, existing_chinese_terms, match_mode,
+                                                 workers, chunk_size, cache)
+    if output_path == STREAM_PATH:
+        stream_output = stream_output or sys.stdout
+        streamed_count = 0
+        for part in untranslated_parts:
+            stream_output.write(part + '\n')
+            stream_output.flush()
+            streamed_count += 1
+        print(f"Streamed {streamed_count} unique untranslated parts.")
+    else:
+        all_untranslated_parts = set(untranslated_parts)
+        try:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                for part_to_write in sort_untranslated_parts(all_untranslated_parts):
+                    f.write(part_to_write + '\n')
+            print(f"Successfully wrote {len(all_untranslated_parts)} unique untranslated parts to '{output_path}'.")
+        except IOError:
+            print(f"Error: Could not write to output file '{output_path}'.")
+            traceback.print_exc()
+
+    if cache is not None:
+        save_segmentation_cache(cache, cache_max_entries)
+        print_cache_stats(cache)
+
+    if extracted_values is not None:
+        write_extracted_values(extracted_values, values_output_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Runs step2 and step3 as one streaming pipeline: extracts cleaned values from a scrape run directory and reports the parts not covered by the dictionary."
+    )
+    parser.add_argument("-i", "--input_dir", required=True,
+                        help="The run directory containing the pokeking_icu_home_X_* data files (.txt or .jsonl).")
+    parser.add_argument("-d", "--dictionary_file", default=os.path.join(STEP3_DIR, "dictionary.json"),
+                        help="The path to your dictionary.json file (default: the one in step3_find_untranslated_values).")
+    parser.add_argument("-o", "--output_file", default=STREAM_PATH,
+                        help="Where to save the untranslated parts, sorted by length. Default '-' streams them to stdout as they are found.")
+    parser.add_argument("--values_output", default=None,
+                        help="Optional file to also save the unique extracted values to, like step2's extracted_pokeking_values.txt.")
+    parser.add_argument("--extract_workers", type=int, default=1,
+                        help="Number of processes to extract the X files with (default: 1, no process pool).")
+    parser.add_argument("--match-mode", choices=sorted(MATCH_MODES), default="trie",
+                        help="How dictionary terms are matched: 'trie' (fast, default) or 'linear' (original scan, for reference).")
+    parser.add_argument("--no-index", action="store_true",
+                        help="Always parse dictionary.json instead of using (and writing) the compiled '.idx' index next to it.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of processes to segment values with (default: 1, no process pool).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Values sent to a worker process at a time in --workers mode (default: {DEFAULT_CHUNK_SIZE}).")
+    parser.add_argument("--cache-file", default=None,
+                        help=f"Reuse segmentations across runs through this cache file, e.g. the dictionary path + '{CACHE_SUFFIX}' "
+                             f"(default: no cache; it only pays off when segmenting takes longer than loading and saving the file).")
+    parser.add_argument("--cache-max-entries", type=int, default=DEFAULT_CACHE_MAX_ENTRIES,
+                        help=f"Maximum cached values; least recently used ones are evicted (default: {DEFAULT_CACHE_MAX_ENTRIES}).")
+
+    args = parser.parse_args()
+
+    if args.workers < 1 or args.chunk_size < 1 or args.cache_max_entries < 1 or args.extract_workers < 1:
+        parser.error("--workers, --chunk-size, --cache-max-entries and --extract_workers must be at least 1.")
+
+
+    # When streaming, stdout carries only the untranslated parts; status messages go to stderr
+    data_stdout = sys.stdout
+    status_stdout = sys.stdout
+    if args.output_file == STREAM_PATH:
+        data_stdout.reconfigure(encoding='utf-8')
+        status_stdout = sys.stderr
+
+    with contextlib.redirect_stdout(status_stdout):
+        run_pipeline(args.input_dir, args.dictionary_file, args.output_file, args.values_output,
+                     args.match_mode, not args.no_index, args.workers, args.chunk_size,
+                     args.cache_file, args.cache_max_entries, data_stdout, args.extract_workers)
@@ -7,8 +7,488 @@
 import json
 import argparse
 import os
+import hashlib
+import mmap
+import struct
+import itertools
+import collections
+import contextlib
+import sys
+import multiprocessing
 
-def get_untranslated_new_values_substring_match(dictionary_path, new_values_path, output_path):
+# Marks the end of a dictionary term inside the trie. Real trie edges are always
+# single characters, so the empty string can never collide with one.
+TRIE_TERM_END = ""
+
+
+def build_term_trie(terms):
+    """
+    Builds a character trie (nested dicts) from the dictionary terms.
+    Each node maps the next character to its child node; a node that completes a
+    term carries TRIE_TERM_END.
+
+    Args:
+        terms (iterable): The Chinese terms (dictionary keys) to index.
+
+    Returns:
+        dict: The root node of the trie.
+    """
+    root = {}
+    for term in terms:
+        if not term:
+            continue # An empty key can never be consumed, same as in the linear scan
+        node = root
+        for char in term:
+            node = node.setdefault(char, {})
+        node[TRIE_TERM_END] = True
+    return root
+
+
+def longest_match_length_trie(term_trie, text, start):
+    """
+    Walks the trie from text[start] and returns the length of the longest
+    dictionary term that text has at that position (0 if there is none).
+    Cost depends only on the length of the match, not on the dictionary size.
+    """
+    node = term_trie
+    best_match_len = 0
+    position = start
+    text_len = len(text)
+    while position < text_len:
+        node = node.get(text[position])
+        if node is None:
+            break
+        position += 1
+        if TRIE_TERM_END in node:
+            best_match_len = position - start
+    return best_match_len
+
+
+def longest_match_length_linear(sorted_terms, text, start):
+    """
+    Reference matcher: scans every dictionary term with startswith, exactly like
+    the original greedy consumption did. Kept for equivalence checks against the trie.
+    """
+    best_match_len = 0
+    for term in sorted_terms:
+        if text.startswith(term, start):
+            if len(term) > best_match_len:
+                best_match_len = len(term)
+                # No break here, as we want to find the *longest* match
+    return best_match_len
+
+
+# Lines handed to a worker process per task in --workers mode
+DEFAULT_CHUNK_SIZE = 500
+
+# Available matchers: name -> (build function, longest-match function)
+MATCH_MODES = {
+    "trie": (build_term_trie, longest_match_length_trie),
+    "linear": (lambda terms: terms, longest_match_length_linear),
+}
+
+
+# Compiled dictionary index, saved next to dictionary.json as "<dictionary>.idx".
+# Layout: magic | sha256 of the dictionary file (32 bytes) | term count (uint32 LE) |
+# the terms, already sorted by length descending, UTF-8 encoded and NUL separated.
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"SKTERMIDX1"
+INDEX_HEADER = struct.Struct(f"<{len(INDEX_MAGIC)}s32sI")
+
+
+def dictionary_content_hash(dictionary_bytes):
+    """Returns the sha256 digest that keys the compiled index to one dictionary version."""
+    return hashlib.sha256(dictionary_bytes).digest()
+
+
+def read_term_index(index_path, expected_hash):
+    """
+    Memory-maps a compiled index and returns its sorted terms, or None if the
+    index is missing, unreadable or was built from a different dictionary.
+    """
+    try:
+        with open(index_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as index_map:
+                if len(index_map) < INDEX_HEADER.size:
+                    return None
+                magic, content_hash, term_count = INDEX_HEADER.unpack_from(index_map, 0)
+                if magic != INDEX_MAGIC or content_hash != expected_hash:
+                    return None
+                if term_count == 0:
+                    return []
+                terms = index_map[INDEX_HEADER.size:].decode('utf-8').split('\0')
+    except (OSError, ValueError, UnicodeDecodeError):
+        # ValueError: mmap of an empty file
+        return None
+
+    if len(terms) != term_count:
+        return None
+    return terms
+
+
+def write_term_index(index_path, content_hash, sorted_terms):
+    """
+    Writes the compiled index atomically (temp file + rename), so a concurrent
+    or interrupted run never sees a half-written index.
+    """
+    temp_path = index_path + ".tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, content_hash, len(sorted_terms)))
+            f.write('\0'.join(sorted_terms).encode('utf-8'))
+        os.replace(temp_path, index_path)
+        return True
+    except OSError as e:
+        print(f"Warning: Could not write dictionary index '{index_path}': {e}")
+        return False
+
+
+def load_sorted_terms(dictionary_path, use_index=True):
+    """
+    Returns the dictionary keys (Chinese terms) sorted by length descending.
+    Longer terms first is crucial for correct "consumption" of the line.
+
+    With use_index, the terms come from the compiled index next to the dictionary
+    when its stored hash matches the dictionary's content; otherwise the dictionary
+    is parsed and sorted and the index is (re)built for the next run.
+
+    Returns:
+        list or None: The sorted terms, or None if the dictionary could not be loaded.
+    """
+    try:
+        with open(dictionary_path, 'rb') as f:
+            dictionary_bytes = f.read()
+    except FileNotFoundError:
+        print(f"Error: Dictionary file not found at '{dictionary_path}'. Please check the path.")
+        return None
+
+    content_hash = dictionary_content_hash(dictionary_bytes)
+    index_path = dictionary_path + INDEX_SUFFIX
+
+    if use_index:
+        sorted_terms = read_term_index(index_path, content_hash)
+        if sorted_terms is not None:
+            print(f"Loaded {len(sorted_terms)} existing Chinese terms from index '{index_path}'.")
+            return sorted_terms
+
+    try:
+        dictionary = json.loads(dictionary_bytes.decode('utf-8'))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        print(f"Error: Could not decode JSON from '{dictionary_path}'. Ensure it's valid JSON.")
+        return None
+
+    # Extract keys (Chinese terms) and sort by length descending
+    sorted_terms = sorted(dictionary.keys(), key=len, reverse=True)
+    print(f"Loaded {len(sorted_terms)} existing Chinese terms from '{dictionary_path}', sorted by length.")
+
+    if use_index and write_term_index(index_path, content_hash, sorted_terms):
+        print(f"Saved dictionary index to '{index_path}'.")
+    return sorted_terms
+
+
+def find_untranslated_parts(line, matcher, longest_match_length):
+    """
+    Greedily "consumes" the line with the longest dictionary term at each position.
+    Characters that no dictionary term starts with are returned as untranslated parts,
+    in the order they appear in the line.
+
+    Args:
+        line (str): The stripped line to segment.
+        matcher: The structure built by the selected match mode (trie or sorted term list).
+        longest_match_length (callable): The longest-match function for that match mode.
+
+    Returns:
+        list: The untranslated characters of the line.
+    """
+    line_untranslated_parts = []
+    position = 0
+    line_len = len(line)
+
+    # We iterate while there's still content in the line to process
+    while position < line_len:
+        best_match_len = longest_match_length(matcher, line, position)
+        if best_match_len:
+            # If a match is found, "consume" it by moving past it
+            position += best_match_len
+        else:
+            # If no dictionary term matches at this position,
+            # take the character as an untranslated part.
+            # This assumes single characters are the smallest unit of untranslation.
+            line_untranslated_parts.append(line[position])
+            position += 1
+
+    return line_untranslated_parts
+
+
+def iter_new_values(lines):
+    """Yields each stripped, non-empty value once, in first-seen order."""
+    seen_values = set()
+    for line in lines:
+        value = line.strip()
+        if value and value not in seen_values:
+            seen_values.add(value)
+            yield value
+
+
+def segment_values(values, matcher, longest_match_length):
+    """
+    Segments every value and returns {value: [unique untranslated parts]}.
+    Values are independent of each other, so any split of the input gives the same
+    merged result.
+    """
+    segmented_values = {}
+    for value in values:
+        segmented_values[value] = list(dict.fromkeys(find_untranslated_parts(value, matcher, longest_match_length)))
+    return segmented_values
+
+
+# Per-process matcher for --workers mode, built once by the pool initializer
+_worker_matcher = {}
+
+
+def _init_segment_worker(sorted_terms, match_mode):
+    """Pool initializer: builds the dictionary matcher once per worker process."""
+    build_matcher, longest_match_length = MATCH_MODES[match_mode]
+    _worker_matcher["matcher"] = build_matcher(sorted_terms)
+    _worker_matcher["longest_match_length"] = longest_match_length
+
+
+def _segment_chunk(values):
+    """Pool task: segments one chunk of values with this worker's matcher."""
+    return segment_values(values, _worker_matcher["matcher"], _worker_matcher["longest_match_length"])
+
+
+def iter_line_chunks(lines, chunk_size):
+    """Yields lists of up to chunk_size lines without reading the whole input first."""
+    lines = iter(lines)
+    while True:
+        chunk = list(itertools.islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Cross-run segmentation cache, opt-in with --cache-file (conventionally "<dictionary>.segcache.json").
+# It maps each value to its untranslated parts under one version of the dictionary keys.
+# Loading and saving it costs more than trie segmentation of a typical run's values, so it
+# is only worth turning on for runs with many values, most of them seen in earlier runs.
+CACHE_SUFFIX = ".segcache.json"
+DEFAULT_CACHE_MAX_ENTRIES = 200000
+
+
+def dictionary_key_version(sorted_terms):
+    """
+    Identifies the dictionary version the cache is valid for. Only the keys matter
+    for segmentation, so edits to translations (values) do not invalidate anything.
+    """
+    return hashlib.sha256('\0'.join(sorted(sorted_terms)).encode('utf-8')).hexdigest()
+
+
+def load_segmentation_cache(cache_path, sorted_terms):
+    """
+    Loads the segmentation cache for the current dictionary keys.
+    When the keys changed since the cache was saved, only entries containing a character
+    of an added or removed key are dropped: greedy segmentation of a value can only change
+    if a changed key occurs inside it.
+
+    Returns:
+        dict: The cache state (entries, run counter and hit/miss statistics).
+    """
+    dictionary_version = dictionary_key_version(sorted_terms)
+    cache = {
+        "path": cache_path,
+        "dictionary_version": dictionary_version,
+        "dictionary_terms": sorted(sorted_terms),
+        "run": 1,
+        "entries": {},
+        "stats": {"hits": 0, "misses": 0, "invalidated": 0, "evicted": 0},
+    }
+
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+        stored_entries = stored["entries"]
+        stored_version = stored["dictionary_version"]
+        stored_terms = stored["dictionary_terms"]
+        cache["run"] = stored["run"] + 1
+    except FileNotFoundError:
+        print(f"No segmentation cache at '{cache_path}' yet; it will be created.")
+        return cache
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        print(f"Warning: Ignoring unreadable segmentation cache '{cache_path}': {e}")
+        return cache
+
+    if stored_version != dictionary_version:
+        changed_terms = set(stored_terms).symmetric_difference(cache["dictionary_terms"])
+        changed_chars = set(''.join(changed_terms))
+        kept_entries = {value: entry for value, entry in stored_entries.items()
+                        if changed_chars.isdisjoint(value)}
+        cache["stats"]["invalidated"] = len(stored_entries) - len(kept_entries)
+        print(f"Dictionary keys changed ({len(changed_terms)} added or removed); "
+              f"invalidated {cache['stats']['invalidated']} cached values.")
+        stored_entries = kept_entries
+
+    cache["entries"] = stored_entries
+    print(f"Loaded {len(stored_entries)} cached segmentations from '{cache_path}'.")
+    return cache
+
+
+def take_cache_misses(values, cache, cached_segmentations):
+    """
+    Appends (value, parts) for every cached value to cached_segmentations and yields
+    only the values that still have to be segmented.
+    """
+    entries = cache["entries"]
+    run = cache["run"]
+    for value in values:
+        entry = entries.get(value)
+        if entry is None:
+            cache["stats"]["misses"] += 1
+            yield value
+        else:
+            cache["stats"]["hits"] += 1
+            entry[1] = run # Mark as used in this run for LRU eviction
+            cached_segmentations.append((value, entry[0]))
+
+
+def save_segmentation_cache(cache, max_entries=DEFAULT_CACHE_MAX_ENTRIES):
+    """
+    Evicts the least recently used entries above max_entries and writes the cache atomically.
+    """
+    entries = cache["entries"]
+    if len(entries) > max_entries:
+        most_recent = sorted(entries.items(), key=lambda item: item[1][1], reverse=True)[:max_entries]
+        cache["stats"]["evicted"] = len(entries) - max_entries
+        entries = dict(most_recent)
+
+    cache_path = cache["path"]
+    temp_path = cache_path + ".tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "dictionary_version": cache["dictionary_version"],
+                "dictionary_terms": cache["dictionary_terms"],
+                "run": cache["run"],
+                "entries": entries,
+            }, f, ensure_ascii=False)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: Could not write segmentation cache '{cache_path}': {e}")
+
+
+def iter_segmentations(values, sorted_terms, match_mode="trie", workers=1,
+                       chunk_size=DEFAULT_CHUNK_SIZE, cache=None):
+    """
+    Yields (value, untranslated parts) for every value as soon as it is segmented.
+    Cached values are answered from the cache; new segmentations are added to it.
+    With workers > 1 the values are segmented in chunks by a pool of worker processes
+    that each build the dictionary matcher once.
+    """
+    cached_segmentations = collections.deque()
+    if cache is not None:
+        values = take_cache_misses(values, cache, cached_segmentations)
+        new_entries = cache["entries"]
+        run = cache["run"]
+
+    if workers > 1:
+        print(f"Using '{match_mode}' match mode with {workers} worker processes.")
+        with multiprocessing.Pool(workers, initializer=_init_segment_worker,
+                                  initargs=(sorted_terms, match_mode)) as pool:
+            for chunk_result in pool.imap_unordered(_segment_chunk, iter_line_chunks(values, chunk_size)):
+                # The pool consumes `values` in a feeder thread, so cache hits arrive alongside
+                while cached_segmentations:
+                    yield cached_segmentations.popleft()
+                for value, parts in chunk_result.items():
+                    if cache is not None:
+                        new_entries[value] = [parts, run]
+                    yield value, parts
+    else:
+        # Build the lookup structure once; every value is then matched against it
+        build_matcher, longest_match_length = MATCH_MODES[match_mode]
+        matcher = build_matcher(sorted_terms)
+        print(f"Using '{match_mode}' match mode.")
+        for value in values:
+            while cached_segmentations:
+                yield cached_segmentations.popleft()
+            parts = list(dict.fromkeys(find_untranslated_parts(value, matcher, longest_match_length)))
+            if cache is not None:
+                new_entries[value] = [parts, run]
+            yield value, parts
+
+    while cached_segmentations:
+        yield cached_segmentations.popleft()
+
+
+def iter_untranslated_parts(lines, sorted_terms, match_mode="trie", workers=1,
+                            chunk_size=DEFAULT_CHUNK_SIZE, cache=None):
+    """
+    Streams the unique untranslated parts of the given lines: each part is yielded once,
+    as soon as the first value containing it has been segmented. Only the dedupe sets of
+    values and parts are held in memory.
+    """
+    seen_parts = set()
+    for value, parts in iter_segmentations(iter_new_values(lines), sorted_terms, match_mode,
+                                           workers, chunk_size, cache):
+        for part in parts:
+            if part not in seen_parts:
+                seen_parts.add(part)
+                yield part
+
+
+# Path meaning "standard input" for the new values file or "standard output" for the
+# untranslated parts, so step3 can be chained with step2 in a shell pipeline
+STREAM_PATH = "-"
+
+
+def open_text_input(path):
+    """Opens a UTF-8 text input for reading; STREAM_PATH reads standard input."""
+    if path == STREAM_PATH:
+        sys.stdin.reconfigure(encoding='utf-8')
+        return contextlib.nullcontext(sys.stdin)
+    return open(path, 'r', encoding='utf-8')
+
+
+# The token store (token_store.py) lives in the repository root, one level above step3
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@contextlib.contextmanager
+def open_token_store_delta(token_store_path, new_run, base_run=None):
+    """
+    Yields the tokens of new_run that are not in base_run (or, without base_run, the
+    tokens first seen in new_run), read from the SQLite token store by index lookups.
+    """
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    from token_store import open_token_store, iter_delta_tokens, run_name_for
+
+    conn = open_token_store(token_store_path)
+    try:
+        yield iter_delta_tokens(conn, run_name_for(new_run), run_name_for(base_run) if base_run else None)
+    finally:
+        conn.close()
+
+
+def print_cache_stats(cache):
+    """Prints the hit/miss counts of a segmentation cache for this run."""
+    stats = cache["stats"]
+    print(f"Segmentation cache: {stats['hits']} hits, {stats['misses']} misses, "
+          f"{stats['invalidated']} invalidated, {stats['evicted']} evicted.")
+
+
+def sort_untranslated_parts(untranslated_parts):
+    """
+    Longest parts first; parts of equal length are ordered by codepoint so the
+    output is the same no matter how (or in how many processes) the input was split.
+    """
+    return sorted(untranslated_parts, key=lambda part: (-len(part), part))
+
+
+def get_untranslated_new_values_substring_match(dictionary_path, new_values_path, output_path,
+                                                match_mode="trie", use_index=True,
+                                                workers=1, chunk_size=DEFAULT_CHUNK_SIZE,
+                                                cache_path=None, cache_max_entries=DEFAULT_CACHE_MAX_ENTRIES,
+                                                stream_output=None, token_store_path=None, base_run=None):
     """
     Compares values from a new text file against keys (Chinese terms) in a dictionary.json
     by attempting to "consume" parts of the line with dictionary terms.
@@ -17,81 +497,83 @@ def get_untranslated_new_values_substring_match(dictionary_path, new_values_path
 
     Args:
         dictionary_path (str): The path to your dictionary.json file.
-        new_values_path (str): The path to your new text file with values to check.
+        new_values_path (str): The path to your new text file with values to check ("-" for stdin).
         output_path (str): The path where the new file with untranslated values will be saved.
+                           With "-" the parts are streamed to stream_output one per line as soon
+                           as they are found (first-seen order) instead of being sorted into a file.
+        match_mode (str): "trie" (default) looks up the longest term through a character trie;
+                          "linear" is the original scan over every term, kept as a reference.
+        use_index (bool): Load the terms from the compiled index next to the dictionary
+                          (rebuilt automatically when the dictionary changes).
+        workers (int): Number of processes to segment with; 1 segments in this process.
+        chunk_size (int): Lines per task when workers > 1.
+        cache_path (str): Segmentation cache file reused across runs; None disables the cache.
+        cache_max_entries (int): Least recently used cache entries above this count are evicted.
+        stream_output: Text stream used when output_path is "-" (default: sys.stdout).
+        token_store_path (str): Read the values from this token store instead of a file;
+                                new_values_path then names the run whose tokens to check.
+        base_run (str): With token_store_path, only check tokens of the run that are not in
+                        this run (default: tokens first seen in the run).
     """
-    # Load the existing dictionary keys and sort them by length (descending)
-    existing_chinese_terms = []
-    try:
-        with open(dictionary_path, 'r', encoding='utf-8') as f:
-            dictionary = json.load(f)
-            # Extract keys (Chinese terms) and sort by length descending
-            # This prioritizes matching longer terms first, which is crucial for
-            # correct "consumption" of the line.
-            existing_chinese_terms = sorted(dictionary.keys(), key=len, reverse=True)
-        print(f"Loaded {len(existing_chinese_terms)} existing Chinese terms from '{dictionary_path}', sorted by length.")
-    except FileNotFoundError:
-        print(f"Error: Dictionary file not found at '{dictionary_path}'. Please check the path.")
+    if match_mode not in MATCH_MODES:
+        print(f"Error: Unknown match mode '{match_mode}'. Choose from: {', '.join(MATCH_MODES)}.")
         return
-    except json.JSONDecodeError:
-        print(f"Error: Could not decode JSON from '{dictionary_path}'. Ensure it's valid JSON.")
+
+    # Load the existing dictionary keys, sorted by length (descending)
+    existing_chinese_terms = load_sorted_terms(dictionary_path, use_index)
+    if existing_chinese_terms is None:
         return
 
-    # Process the new values file
-    all_untranslated_chars_and_substrings = set() # Use a set to store unique untranslated parts
+    cache = load_segmentation_cache(cache_path, existing_chinese_terms) if cache_path else None
+
+    if token_store_path:
+        if not os.path.exists(token_store_path):
+            print(f"Error: Token store not found at '{token_store_path}'. Please check the path.")
+            return
+        open_values = open_token_store_delta(token_store_path, new_values_path, base_run)
+        delta_description = f"not in run '{base_run}'" if base_run else "first seen in it"
+        print(f"Checking tokens of run '{new_values_path}' {delta_description} from token store '{token_store_path}'.")
+    else:
+        open_values = open_text_input(new_values_path)
+
+    # Process the new values file, collecting unique untranslated parts in a set
     try:
-        with open(new_values_path, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                original_line = line.strip()
-                if not original_line:
-                    continue
-
-                remaining_line = original_line
-                line_untranslated_parts = []
-
-                # We iterate while there's still content in the line to process
-                while remaining_line:
-                    found_match_in_segment = False
-                    best_match_len = 0
-                    matched_term = ""
-
-                    # Try to find the longest possible dictionary term at the beginning of remaining_line
-                    for term in existing_chinese_terms:
-                        if remaining_line.startswith(term):
-                            if len(term) > best_match_len:
-                                best_match_len = len(term)
-                                matched_term = term
-                                found_match_in_segment = True
-                                # No break here, as we want to find the *longest* match
-
-                    if found_match_in_segment:
-                        # If a match is found, "consume" it by removing it from the beginning of remaining_line
-                        remaining_line = remaining_line[best_match_len:]
-                    else:
-                        # If no dictionary term matches the beginning of the remaining_line,
-                        # take the first character as an untranslated part.
-                        # This assumes single characters are the smallest unit of untranslation.
-                        untranslated_char = remaining_line[0]
-                        line_untranslated_parts.append(untranslated_char)
-                        remaining_line = remaining_line[1:] # Move past this character
-
-                if line_untranslated_parts:
-                    # Add unique untranslated parts from this line to the global set
-                    for part in line_untranslated_parts:
-                        all_untranslated_chars_and_substrings.add(part)
-
-        print(f"Finished processing '{new_values_path}'. Found {len(all_untranslated_chars_and_substrings)} unique untranslated parts.")
+        with open_values as f:
+            untranslated_parts = iter_untranslated_parts(
+                f, existing_chinese_terms, match_mode, workers, chunk_size, cache)
+
+            if output_path == STREAM_PATH:
+                stream_output = stream_output or sys.stdout
+                streamed_count = 0
+                for part in untranslated_parts:
+                    stream_output.write(part + '\n')
+                    stream_output.flush()
+                    streamed_count += 1
+                print(f"Finished processing '{new_values_path}'. Streamed {streamed_count} unique untranslated parts.")
+            else:
+                all_untranslated_chars_and_substrings = set(untranslated_parts)
+                print(f"Finished processing '{new_values_path}'. Found {len(all_untranslated_chars_and_substrings)} unique untranslated parts.")
 
     except FileNotFoundError:
         print(f"Error: New values file not found at '{new_values_path}'. Please check the path.")
         return
+    except ValueError as e:
+        # A run that has not been ingested into the token store
+        print(f"Error: {e}")
+        return
+
+    if cache is not None:
+        save_segmentation_cache(cache, cache_max_entries)
+        print_cache_stats(cache)
+
+    if output_path == STREAM_PATH:
+        return
 
     # Write the unique untranslated parts to the output file, one per line
     try:
         with open(output_path, 'w', encoding='utf-8') as f:
             # Sort for consistent output, though a set doesn't guarantee order
-            sorted_untranslated_parts = sorted(list(all_untranslated_chars_and_substrings), key=len, reverse=True)
-            for part_to_write in sorted_untranslated_parts:
+            for part_to_write in sort_untranslated_parts(all_untranslated_chars_and_substrings):
                 f.write(part_to_write + '\n')
         print(f"Successfully wrote unique untranslated parts to '{output_path}'.")
     except IOError:
@@ -101,8 +583,26 @@ def get_untranslated_new_values_substring_match(dictionary_path, new_values_path
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Find untranslated characters/substrings in a text file by comparing against a JSON dictionary.")
     parser.add_argument("dictionary_file", help="The path to your dictionary.json file.")
-    parser.add_argument("new_values_file", help="The path to your new text file with values to check.")
-    parser.add_argument("output_file", help="The path where the new file with untranslated values will be saved.")
+    parser.add_argument("new_values_file", help="The path to your new text file with values to check ('-' reads stdin). With --token-store, the run (directory name) whose tokens to check.")
+    parser.add_argument("output_file", help="The path where the new file with untranslated values will be saved ('-' streams them to stdout as they are found).")
+    parser.add_argument("--match-mode", choices=sorted(MATCH_MODES), default="trie",
+                        help="How dictionary terms are matched: 'trie' (fast, default) or 'linear' (original scan, for reference).")
+    parser.add_argument("--no-index", action="store_true",
+                        help="Always parse dictionary.json instead of using (and writing) the compiled '.idx' index next to it.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of processes to segment lines with (default: 1, no process pool).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Lines sent to a worker process at a time in --workers mode (default: {DEFAULT_CHUNK_SIZE}).")
+    parser.add_argument("--cache-file", default=None,
+                        help=f"Reuse segmentations across runs through this cache file, e.g. the dictionary path + '{CACHE_SUFFIX}' "
+                             f"(default: no cache; it only pays off when segmenting takes longer than loading and saving the file).")
+    parser.add_argument("--cache-max-entries", type=int, default=DEFAULT_CACHE_MAX_ENTRIES,
+                        help=f"Maximum cached values; least recently used ones are evicted (default: {DEFAULT_CACHE_MAX_ENTRIES}).")
+
+    parser.add_argument("--token-store", default=None,
+                        help="Read the values from this token store database (see token_store.py) instead of a text file.")
+    parser.add_argument("--base-run", default=None,
+                        help="With --token-store, only check tokens that are not in this run (default: tokens first seen in the run).")
 
     args = parser.parse_args()
 
@@ -110,4 +610,21 @@ if __name__ == "__main__":
     new_text_file_path = args.new_values_file
     output_new_file_path = args.output_file
 
-    get_untranslated_new_values_substring_match(dictionary_path, new_text_file_path, output_new_file_path)
\ No newline at end of file
+    if args.workers < 1 or args.chunk_size < 1 or args.cache_max_entries < 1:
+        parser.error("--workers, --chunk-size and --cache-max-entries must be at least 1.")
+
+
+    # With "-" as output, stdout carries only the untranslated parts so it can be piped
+    # into another command; status messages go to stderr instead.
+    data_stdout = sys.stdout
+    status_stdout = sys.stdout
+    if output_new_file_path == STREAM_PATH:
+        data_stdout.reconfigure(encoding='utf-8')
+        status_stdout = sys.stderr
+
+    with contextlib.redirect_stdout(status_stdout):
+        get_untranslated_new_values_substring_match(dictionary_path, new_text_file_path, output_new_file_path,
+                                                    args.match_mode, not args.no_index,
+                                                    args.workers, args.chunk_size,
+                                                    args.cache_file, args.cache_max_entries,
+                                                    data_stdout, args.token_store, args.base_run)
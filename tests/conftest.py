@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The step scripts are modules at the top of the repository, not an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,98 @@
+# Scrapes a local stand-in for a target page (tests/fixtures/target_page.html) with each of
+# step1's ways of opening and reading a page, and checks they all write the X files click
+# mode writes. Needs selenium, Chrome and chromedriver; skipped where the browser cannot be
+# started. test_page_records.py checks the records built from the script output without one.
+
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("selenium")
+
+import step1_scrapepokeking as step1
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+TARGET_PAGE_PATH = "/home/1/4"
+
+
+def read_fixture(filename):
+    with open(os.path.join(FIXTURES_DIR, filename), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class TargetPageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = read_fixture("target_page.html").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def page_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TargetPageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}{TARGET_PAGE_PATH}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope="module")
+def driver():
+    try:
+        driver = step1.initialize_driver()
+    except Exception as e:
+        pytest.skip(f"Chrome could not be started: {e}")
+    yield driver
+    driver.quit()
+
+
+def scrape_x_files(driver, page_url, output_dir, extract):
+    """Loads the page, extracts it with extract(driver, url) and returns {X file name: bytes}."""
+    os.makedirs(output_dir)
+    driver.get(page_url)
+    extracted_data = extract(driver, page_url)
+    step1.write_page_data(output_dir, step1.x_val_from_url(page_url), extracted_data, page_url)
+    x_files = {}
+    for filename in sorted(os.listdir(output_dir)):
+        with open(os.path.join(output_dir, filename), "rb") as f:
+            x_files[filename] = f.read()
+    return x_files
+
+
+def test_click_mode_reads_the_expected_records(driver, page_url):
+    driver.get(page_url)
+    extracted_data = step1.extract_specific_data_from_page(driver, page_url, "click")
+    assert extracted_data == json.loads(read_fixture("target_page_expected.json"))
+
+
+def test_bulk_expansion_writes_the_x_files_of_click_mode(driver, page_url, tmp_path):
+    click_files = scrape_x_files(driver, page_url, str(tmp_path / "click"),
+                                 lambda d, url: step1.extract_specific_data_from_page(d, url, "click"))
+    bulk_files = scrape_x_files(driver, page_url, str(tmp_path / "bulk"),
+                                lambda d, url: step1.extract_specific_data_from_page(d, url, "bulk"))
+    assert sorted(click_files) == ["pokeking_icu_home_X_1_data.jsonl", "pokeking_icu_home_X_1_data.txt"]
+    assert bulk_files == click_files
+
+
+@pytest.mark.parametrize("extraction", ["js", "compare"])
+def test_script_extraction_writes_the_x_files_of_click_mode(driver, page_url, tmp_path, extraction):
+    click_files = scrape_x_files(driver, page_url, str(tmp_path / "click"),
+                                 lambda d, url: step1.extract_specific_data_from_page(d, url, "click"))
+    script_files = scrape_x_files(driver, page_url, str(tmp_path / extraction),
+                                  lambda d, url: step1.extract_page_data(d, url, extraction))
+    assert script_files == click_files
+
+
+def test_compare_mode_reports_no_difference(driver, page_url, capsys):
+    driver.get(page_url)
+    step1.extract_page_data(driver, page_url, "compare")
+    assert "Extraction engines agree" in capsys.readouterr().out
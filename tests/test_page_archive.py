@@ -0,0 +1,72 @@
+# Re-extraction from the HTML archive: an archived page (tests/fixtures/target_page_archived.html,
+# the target page fixture as click mode leaves it) must give the records click mode read.
+
+import os
+import json
+
+import pytest
+
+pytest.importorskip("lxml")
+
+import step1_page_records as records
+from step1_page_archive import read_archived_page, reextract_archive
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGE_URL = "http://www.pokeking.icu/home/1/4"
+
+
+def read_fixture(filename):
+    with open(os.path.join(FIXTURES_DIR, filename), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def read_x_files(directory):
+    x_files = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.startswith("pokeking_icu_home_X_"):
+            with open(os.path.join(directory, filename), "rb") as f:
+                x_files[filename] = f.read()
+    return x_files
+
+
+@pytest.fixture
+def run_dir(tmp_path):
+    """A run directory whose archive holds the fixture page, as scraped with --archive_html."""
+    run_dir = str(tmp_path / "run")
+    archive_dir = os.path.join(run_dir, records.ARCHIVE_DIRNAME)
+    os.makedirs(archive_dir)
+    records.archive_page_html(archive_dir, PAGE_URL, records.x_val_from_url(PAGE_URL), read_fixture("target_page_archived.html"))
+    return run_dir
+
+
+def test_archived_page_reads_the_click_mode_records():
+    page = read_archived_page(read_fixture("target_page_archived.html"))
+    extracted_data = records.page_data_from_script(page, *records.page_xy_from_url(PAGE_URL))
+    assert extracted_data == json.loads(read_fixture("target_page_expected.json"))
+
+
+def test_reextract_writes_the_x_files_of_the_scraped_run(run_dir, tmp_path):
+    expected_dir = str(tmp_path / "expected")
+    os.makedirs(expected_dir)
+    records.write_page_data(expected_dir, 1, json.loads(read_fixture("target_page_expected.json")), PAGE_URL)
+
+    assert reextract_archive(run_dir) == 1
+    assert read_x_files(os.path.join(run_dir, "reextracted")) == read_x_files(expected_dir)
+
+
+def test_reextract_replaces_earlier_x_files(run_dir, tmp_path):
+    output_dir = str(tmp_path / "reextracted")
+    assert reextract_archive(run_dir, output_dir) == 1
+    first_x_files = read_x_files(output_dir)
+    assert reextract_archive(run_dir, output_dir) == 1
+    assert read_x_files(output_dir) == first_x_files
+
+
+def test_reextract_refuses_to_write_into_the_run_directory(run_dir):
+    x_file_path = os.path.join(run_dir, "pokeking_icu_home_X_1_data.txt")
+    with open(x_file_path, "w", encoding="utf-8") as f:
+        f.write("scraped with the browser")
+
+    assert reextract_archive(run_dir, os.path.join(run_dir, ".")) == 0
+    with open(x_file_path, "r", encoding="utf-8") as f:
+        assert f.read() == "scraped with the browser"
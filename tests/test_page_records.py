@@ -0,0 +1,75 @@
+# The records step1 builds from what its page scripts return, without a browser:
+# tests/fixtures/target_page_script.json is the target page fixture as COLLAPSED_CARDS_SCRIPT
+# and EXTRACT_PAGE_SCRIPT read it (merged the way extract_page_data_with_script merges them).
+
+import os
+import json
+
+from step1_page_records import nested_data_from_script, page_data_from_script, page_xy_from_url
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGE_URL = "http://www.pokeking.icu/home/1/4"
+ERROR_TEXT = "Error during processing, data not captured."
+
+
+def read_fixture(filename):
+    with open(os.path.join(FIXTURES_DIR, filename), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def script_node(header_label=None, header_operate=None, trick=None, warning_badge=None, body_texts=(), children=()):
+    return {"header_label": header_label, "header_operate": header_operate, "trick": trick,
+            "warning_badge": warning_badge, "body_texts": list(body_texts), "children": list(children)}
+
+
+def script_card(nested_items=(), body_visible=True, pokemon_name=None, red_bold_text=None, warning_badge_text=None):
+    return {"pokemon_name": pokemon_name, "red_bold_text": red_bold_text, "warning_badge_text": warning_badge_text,
+            "body_visible": body_visible, "nested_items": list(nested_items)}
+
+
+def test_script_result_gives_the_click_mode_records():
+    extracted_data = page_data_from_script(read_fixture("target_page_script.json"), *page_xy_from_url(PAGE_URL))
+    assert extracted_data == read_fixture("target_page_expected.json")
+
+
+def test_texts_are_stripped_and_missing_elements_are_na():
+    page = {"alert_box_texts": ["  雷电拳点\n", " "],
+            "cards": [script_card(pokemon_name=" 出磁怪 ", red_bold_text="", warning_badge_text=None)]}
+    alert_box, card = page_data_from_script(page, 1, 4)
+    assert alert_box["alert_box_texts"] == ["雷电拳点"]
+    assert (card["pokemon_name"], card["red_bold_text"], card["warning_badge_text"]) == ("出磁怪", "", "N/A")
+
+
+def test_page_without_alert_box_has_only_card_records():
+    extracted_data = page_data_from_script({"alert_box_texts": None, "cards": [script_card()]}, 1, 4)
+    assert [data_item["type"] for data_item in extracted_data] == ["card_data"]
+
+
+def test_hidden_card_body_gives_no_nested_items():
+    page = {"alert_box_texts": None, "cards": [script_card([script_node("出飞鱼", "切鬼灯戏法")], body_visible=False)]}
+    assert page_data_from_script(page, 1, 4)[0]["nested_items"] == []
+
+
+def test_nested_item_without_title_is_recorded_as_an_error():
+    nested_data = nested_data_from_script([{"error": True}, script_node("出飞鱼", "切鬼灯戏法")])
+    assert nested_data[0] == {
+        "nested_index": "0-1",
+        "nested_header_label_text": "N/A",
+        "nested_header_operate_text": "N/A",
+        "nested_trick_text": ERROR_TEXT,
+        "nested_body_label_text": ERROR_TEXT,
+        "nested_body_operate_text": ERROR_TEXT,
+        "nested_warning_badge_text": ERROR_TEXT,
+        "sub_nested_items": []
+    }
+    assert nested_data[1]["nested_index"] == "0-2"
+    assert nested_data[1]["nested_header_label_text"] == "出飞鱼"
+
+
+def test_body_texts_fill_label_then_operate_and_children_go_one_level_down():
+    child = script_node("满血", "地鼠补钉，刺甲6", body_texts=[" 补钉后 "])
+    nested_data = nested_data_from_script([script_node("大地之力", "看飞鱼血量", children=[child])])
+    sub_nested_item = nested_data[0]["sub_nested_items"][0]
+    assert sub_nested_item["nested_index"] == "1-1"
+    assert sub_nested_item["nested_body_label_text"] == "补钉后"
+    assert sub_nested_item["nested_body_operate_text"] == "N/A"
@@ -0,0 +1,223 @@
+# cmd prompt ex:
+# python token_store.py ingest 61A55F7ED537C94F367D327BBF6073C6_code
+# python token_store.py ingest 8E8EBC6ECBC9DEE4FE9BFAEC97A05375_code
+# python token_store.py delta 8E8EBC6ECBC9DEE4FE9BFAEC97A05375_code --base 61A55F7ED537C94F367D327BBF6073C6_code
+# python token_store.py pages 戏法
+# step3 can read a delta straight from the store, see --token-store in step3_filter_untranslated_values.py
+
+import os
+import sys
+import argparse
+import sqlite3
+import traceback
+from datetime import datetime
+
+from step2_data_by_x_into_txt import (
+    DEFAULT_CLEAN_TABLE,
+    iter_file_field_records,
+    iter_value_tokens,
+    list_data_files,
+)
+
+DEFAULT_DB_PATH = "pokeking_tokens.db"
+
+# runs:        one row per ingested scrape run directory, in ingestion order
+# tokens:      every distinct cleaned token, with the run it was first ingested from
+#              (indexed, so "tokens first seen in run B" is an index lookup)
+# run_tokens:  which tokens a run contains; its primary key makes run deltas index lookups
+# occurrences: where a token was found (run, X file, page x/y, field); its primary key
+#              starts with token_id, so "which pages contain token T" is an index range
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    token_id INTEGER PRIMARY KEY,
+    token TEXT NOT NULL UNIQUE,
+    first_run_id INTEGER NOT NULL REFERENCES runs(run_id)
+);
+CREATE TABLE IF NOT EXISTS run_tokens (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    token_id INTEGER NOT NULL REFERENCES tokens(token_id),
+    PRIMARY KEY (run_id, token_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS occurrences (
+    token_id INTEGER NOT NULL REFERENCES tokens(token_id),
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    x_file TEXT NOT NULL,
+    page_x TEXT NOT NULL,
+    page_y TEXT NOT NULL,
+    field TEXT NOT NULL,
+    PRIMARY KEY (token_id, run_id, x_file, page_x, page_y, field)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tokens_by_first_run ON tokens (first_run_id);
+CREATE INDEX IF NOT EXISTS occurrences_by_run ON occurrences (run_id);
+"""
+
+
+def open_token_store(db_path=DEFAULT_DB_PATH):
+    """Opens (creating if needed) the token store database and returns the connection."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def run_name_for(run_dir):
+    """Runs are identified by their directory name, e.g. '8E8EBC6ECBC9DEE4FE9BFAEC97A05375_code'."""
+    return os.path.basename(os.path.normpath(run_dir))
+
+
+def get_run_id(conn, run_name):
+    """Returns the run_id of an ingested run, or None if it has not been ingested."""
+    row = conn.execute("SELECT run_id FROM runs WHERE name = ?", (run_name,)).fetchone()
+    return row[0] if row else None
+
+
+def ingest_run(conn, run_dir, clean_table=DEFAULT_CLEAN_TABLE):
+    """
+    Ingests every token of a scrape run directory together with its provenance.
+    Re-ingesting a run replaces its previous rows, so ingestion is idempotent.
+
+    Returns:
+        int: The number of distinct tokens in the run, or None if the directory is missing.
+    """
+    if not os.path.exists(run_dir):
+        print(f"Error: Run directory '{run_dir}' not found.")
+        return None
+
+    run_name = run_name_for(run_dir)
+    print(f"Ingesting run '{run_name}' from: {run_dir}")
+
+    with conn:
+        run_id = get_run_id(conn, run_name)
+        if run_id is None:
+            run_id = conn.execute("INSERT INTO runs (name, ingested_at) VALUES (?, ?)",
+                                  (run_name, datetime.now().isoformat(timespec='seconds'))).lastrowid
+        else:
+            print(f"    Run '{run_name}' was ingested before; replacing its rows.")
+            conn.execute("DELETE FROM occurrences WHERE run_id = ?", (run_id,))
+            conn.execute("DELETE FROM run_tokens WHERE run_id = ?", (run_id,))
+
+        token_ids = {}
+        for filename in list_data_files(run_dir):
+            print(f"    Processing file: {filename}")
+            occurrence_rows = set()
+            try:
+                for page_x, page_y, field_name, value in iter_file_field_records(os.path.join(run_dir, filename)):
+                    for token in iter_value_tokens(value, clean_table):
+                        token_id = token_ids.get(token)
+                        if token_id is None:
+                            conn.execute("INSERT OR IGNORE INTO tokens (token, first_run_id) VALUES (?, ?)",
+                                         (token, run_id))
+                            token_id = conn.execute("SELECT token_id FROM tokens WHERE token = ?",
+                                                    (token,)).fetchone()[0]
+                            token_ids[token] = token_id
+                        occurrence_rows.add((token_id, run_id, filename, page_x, page_y, field_name))
+            except Exception as e:
+                print(f"    Error processing file {filename}: {e}")
+                traceback.print_exc()
+
+            conn.executemany("INSERT OR IGNORE INTO occurrences VALUES (?, ?, ?, ?, ?, ?)", occurrence_rows)
+
+        conn.executemany("INSERT INTO run_tokens (run_id, token_id) VALUES (?, ?)",
+                         [(run_id, token_id) for token_id in token_ids.values()])
+
+    print(f"Ingested {len(token_ids)} distinct tokens for run '{run_name}'.")
+    return len(token_ids)
+
+
+def iter_delta_tokens(conn, new_run, base_run=None):
+    """
+    Yields, in sorted order, the tokens of new_run that do not appear in base_run.
+    Without base_run, yields the tokens new_run was the first ingested run to contain.
+    Both are answered from the run_tokens/tokens indexes, not by rescanning files.
+    """
+    new_run_id = get_run_id(conn, new_run)
+    if new_run_id is None:
+        raise ValueError(f"Run '{new_run}' has not been ingested into the token store.")
+
+    if base_run is None:
+        cursor = conn.execute(
+            "SELECT token FROM tokens WHERE first_run_id = ? ORDER BY token", (new_run_id,))
+    else:
+        base_run_id = get_run_id(conn, base_run)
+        if base_run_id is None:
+            raise ValueError(f"Run '{base_run}' has not been ingested into the token store.")
+        cursor = conn.execute(
+            """
+            SELECT t.token
+            FROM run_tokens AS new_rt
+            JOIN tokens AS t ON t.token_id = new_rt.token_id
+            WHERE new_rt.run_id = ?
+              AND NOT EXISTS (SELECT 1 FROM run_tokens AS base_rt
+                              WHERE base_rt.run_id = ? AND base_rt.token_id = new_rt.token_id)
+            ORDER BY t.token
+            """, (new_run_id, base_run_id))
+    for (token,) in cursor:
+        yield token
+
+
+def find_token_pages(conn, token):
+    """Returns [(run, X file, page_x, page_y, field)] for every place the token was found."""
+    return conn.execute(
+        """
+        SELECT r.name, o.x_file, o.page_x, o.page_y, o.field
+        FROM tokens AS t
+        JOIN occurrences AS o ON o.token_id = t.token_id
+        JOIN runs AS r ON r.run_id = o.run_id
+        WHERE t.token = ?
+        ORDER BY r.run_id, o.x_file, o.page_x, o.page_y, o.field
+        """, (token,)).fetchall()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Local SQLite store of step2 tokens across scrape runs, with their provenance (run, X file, page, field)."
+    )
+    parser.add_argument("--db", default=DEFAULT_DB_PATH,
+                        help=f"The token store database file (default: {DEFAULT_DB_PATH}).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Ingest one or more scrape run directories.")
+    ingest_parser.add_argument("run_dirs", nargs="+", help="Run directories containing pokeking_icu_home_X_* data files (.txt or .jsonl).")
+
+    delta_parser = subparsers.add_parser("delta", help="Print the tokens of a run that are new compared to another run.")
+    delta_parser.add_argument("new_run", help="The run (directory name) to list tokens from.")
+    delta_parser.add_argument("--base", default=None,
+                              help="Only list tokens not in this run. Default: tokens first seen in new_run.")
+
+    pages_parser = subparsers.add_parser("pages", help="List the runs, X files, pages and fields that contain a token.")
+    pages_parser.add_argument("token", help="The token to look up.")
+
+    subparsers.add_parser("runs", help="List the ingested runs.")
+
+    args = parser.parse_args()
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    conn = open_token_store(args.db)
+    try:
+        if args.command == "ingest":
+            for run_dir in args.run_dirs:
+                ingest_run(conn, run_dir)
+        elif args.command == "delta":
+            try:
+                for token in iter_delta_tokens(conn, run_name_for(args.new_run),
+                                               run_name_for(args.base) if args.base else None):
+                    print(token)
+            except ValueError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+        elif args.command == "pages":
+            rows = find_token_pages(conn, args.token)
+            if not rows:
+                print(f"Token '{args.token}' is not in the token store.")
+            for run_name, x_file, page_x, page_y, field_name in rows:
+                print(f"{run_name}  {x_file}  page {page_x}/{page_y}  {field_name}")
+        elif args.command == "runs":
+            for run_id, run_name, ingested_at in conn.execute("SELECT run_id, name, ingested_at FROM runs ORDER BY run_id"):
+                print(f"{run_id}  {run_name}  (ingested {ingested_at})")
+    finally:
+        conn.close()